@@ -1,5 +1,13 @@
+import hashlib
+import json
+import os
+import time
 import urllib.request
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
 
 BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
 
@@ -17,40 +25,614 @@ NUC_COMPLEMENT = {
 }
 
 REPORT_FILE = "inverted_repeats_report.txt"
+# When True, main also writes every analysed genome to GENOMES_FASTA_FILE, e.g. for markov.score_fasta (L13).
+EXPORT_FASTA = False
+GENOMES_FASTA_FILE = "genomes.fasta"
+FASTA_LINE_WIDTH = 60
 
+# Local genome cache: packed 2-bit sequences named by their SHA-256, indexed by accession.
+CACHE_DIR = "genome_cache"
+CACHE_INDEX_FILE = "index.json"
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Pre-seeded "<accession>.fasta" / ".fa" / ".fna" files are imported from here before NCBI is tried.
+SEED_FASTA_DIR = "genomes"
+SEED_FASTA_EXTENSIONS = (".fasta", ".fa", ".fna")
+# When True, never contact NCBI: genomes must come from the cache or SEED_FASTA_DIR.
+OFFLINE = False
+PACKED_MAGIC = b"GPK1"
 
-def download_genome(accession: str) -> str:
+SEARCH_MODE = "palindromic"  # or "gapped"
+
+# Gapped (terminal inverted repeat style) search settings
+GAPPED_ARM_LEN = 20
+GAPPED_MIN_SPACER = 0
+GAPPED_MAX_SPACER = 200
+GAPPED_MAX_MISMATCHES = 2
+
+# Parallel pipeline: WORKERS > 1 scans all genomes as overlapping chunks on a process pool.
+WORKERS = 1
+CHUNK_SIZE = 250_000
+
+# Streaming report: hits go straight into per-length aggregators instead of (start, end, motif) lists.
+STREAMING_REPORT = False
+RESERVOIR_SIZE = 0
+
+# A=0, C=1, G=2, T=3, anything else (N, IUPAC, lowercase) = 4.
+# Two codes are complementary exactly when they sum to 3.
+BASE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate("ACGT"):
+    BASE_CODES[ord(_base)] = _code
+INVALID_CODE = 4
+
+
+def fetch_genome(accession: str) -> str:
     url = f"{BASE_URL}?db=nuccore&id={accession}&rettype=fasta&retmode=text"
+    seq_parts = []
     with urllib.request.urlopen(url) as response:
-        data = response.read().decode("utf-8")
-    lines = data.splitlines()
-    seq_lines = [line.strip() for line in lines if not line.startswith(">")]
-    return "".join(seq_lines).upper()
+        for raw in response:
+            if raw.startswith(b">"):
+                continue
+            seq_parts.append(raw.strip())
+    return b"".join(seq_parts).decode("ascii").upper()
+
+
+def read_fasta_sequence(path: str) -> str:
+    seq_parts = []
+    with open(path, "rb") as f:
+        for raw in f:
+            if raw.startswith(b">"):
+                continue
+            seq_parts.append(raw.strip())
+    return b"".join(seq_parts).decode("ascii").upper()
+
+
+def pack_sequence(sequence: str) -> bytes:
+    """
+    Layout: magic, length, number of non-ACGT runs, SHA-256 of the sequence,
+    the runs (starts, lengths, characters) and finally 4 bases per byte.
+    """
+    raw = np.frombuffer(sequence.encode("ascii", errors="replace"), dtype=np.uint8)
+    n = len(raw)
+    codes = BASE_CODES[raw]
+    invalid = codes == INVALID_CODE
+
+    exc_pos = np.flatnonzero(invalid)
+    if len(exc_pos):
+        new_run = np.ones(len(exc_pos), dtype=bool)
+        new_run[1:] = (np.diff(exc_pos) != 1) | (raw[exc_pos[1:]] != raw[exc_pos[:-1]])
+        run_first = np.flatnonzero(new_run)
+        run_starts = exc_pos[run_first].astype(np.uint64)
+        run_lengths = np.diff(np.append(run_first, len(exc_pos))).astype(np.uint64)
+        run_chars = raw[exc_pos[run_first]]
+    else:
+        run_starts = run_lengths = np.zeros(0, dtype=np.uint64)
+        run_chars = np.zeros(0, dtype=np.uint8)
+
+    padded = np.zeros((n + 3) // 4 * 4, dtype=np.uint8)
+    padded[:n] = np.where(invalid, 0, codes)
+    quads = padded.reshape(-1, 4)
+    packed = (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+
+    header = PACKED_MAGIC + np.array([n, len(run_starts)], dtype="<u8").tobytes()
+    digest = hashlib.sha256(raw.tobytes()).digest()
+    return b"".join([header, digest, run_starts.astype("<u8").tobytes(), run_lengths.astype("<u8").tobytes(),
+                     run_chars.tobytes(), packed.tobytes()])
+
+
+def unpack_sequence(data: bytes) -> str:
+    if data[:4] != PACKED_MAGIC:
+        raise ValueError("Not a packed genome file.")
+    n, n_runs = np.frombuffer(data, dtype="<u8", count=2, offset=4).tolist()
+    digest = data[20:52]
+    offset = 52
+    run_starts = np.frombuffer(data, dtype="<u8", count=n_runs, offset=offset).astype(np.int64)
+    offset += 8 * n_runs
+    run_lengths = np.frombuffer(data, dtype="<u8", count=n_runs, offset=offset).astype(np.int64)
+    offset += 8 * n_runs
+    run_chars = np.frombuffer(data, dtype=np.uint8, count=n_runs, offset=offset)
+    offset += n_runs
+    packed = np.frombuffer(data, dtype=np.uint8, count=(n + 3) // 4, offset=offset)
+
+    codes = np.empty((len(packed), 4), dtype=np.uint8)
+    for j, shift in enumerate((6, 4, 2, 0)):
+        codes[:, j] = (packed >> shift) & 3
+    raw = np.frombuffer(b"ACGT", dtype=np.uint8)[codes.reshape(-1)[:n]]
+    if n_runs:
+        total = int(run_lengths.sum())
+        first = np.repeat(run_starts - (np.cumsum(run_lengths) - run_lengths), run_lengths)
+        raw[first + np.arange(total)] = np.repeat(run_chars, run_lengths)
+    if hashlib.sha256(raw.tobytes()).digest() != digest:
+        raise ValueError("Packed genome failed its checksum.")
+    return raw.tobytes().decode("ascii")
+
+
+def _load_cache_index(cache_dir: str) -> dict:
+    path = os.path.join(cache_dir, CACHE_INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_cache_index(cache_dir: str, index: dict) -> None:
+    path = os.path.join(cache_dir, CACHE_INDEX_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def load_cached_genome(accession: str, cache_dir: str = CACHE_DIR):
+    index = _load_cache_index(cache_dir)
+    entry = index.get(accession)
+    if entry is None:
+        return None
+    path = os.path.join(cache_dir, entry["file"])
+    try:
+        with open(path, "rb") as f:
+            sequence = unpack_sequence(f.read())
+    except (OSError, ValueError):
+        del index[accession]
+        _save_cache_index(cache_dir, index)
+        return None
+    entry["last_used"] = time.time()
+    _save_cache_index(cache_dir, index)
+    return sequence
+
+
+def store_cached_genome(accession: str, sequence: str, cache_dir: str = CACHE_DIR,
+                        max_bytes: int = CACHE_MAX_BYTES) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+    data = pack_sequence(sequence)
+    checksum = data[20:52].hex()
+    file_name = f"{checksum}.gpk"
+    path = os.path.join(cache_dir, file_name)
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    index = _load_cache_index(cache_dir)
+    index[accession] = {"sha256": checksum, "file": file_name, "size": len(data), "last_used": time.time()}
+    _evict_least_recently_used(cache_dir, index, max_bytes, keep=file_name)
+    _save_cache_index(cache_dir, index)
+
+
+def _evict_least_recently_used(cache_dir: str, index: dict, max_bytes: int, keep: str) -> None:
+    # several accessions can share one content-addressed file; it is used as recently as its newest entry
+    files = {}
+    for accession, entry in index.items():
+        size, last_used, owners = files.get(entry["file"], (entry["size"], 0.0, []))
+        files[entry["file"]] = (size, max(last_used, entry["last_used"]), owners + [accession])
+
+    total = sum(size for size, _, _ in files.values())
+    for file_name, (size, _, owners) in sorted(files.items(), key=lambda item: item[1][1]):
+        if total <= max_bytes:
+            break
+        if file_name == keep:
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, file_name))
+        except FileNotFoundError:
+            pass
+        for accession in owners:
+            del index[accession]
+        total -= size
+
+
+def find_seed_fasta(accession: str, seed_dir: str = SEED_FASTA_DIR):
+    for ext in SEED_FASTA_EXTENSIONS:
+        path = os.path.join(seed_dir, accession + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def download_genome(accession: str) -> str:
+    sequence = load_cached_genome(accession)
+    if sequence is not None:
+        return sequence
+
+    seed_path = find_seed_fasta(accession)
+    if seed_path is not None:
+        sequence = read_fasta_sequence(seed_path)
+    elif OFFLINE:
+        raise FileNotFoundError(f"{accession} is not cached and no seed FASTA was found in '{SEED_FASTA_DIR}'.")
+    else:
+        sequence = fetch_genome(accession)
+    store_cached_genome(accession, sequence)
+    return sequence
+
+
+def write_genomes_fasta(path: str, genomes, sequences, line_width: int = FASTA_LINE_WIDTH) -> None:
+    with open(path, "w", encoding="ascii") as f:
+        for (accession, name), sequence in zip(genomes, sequences):
+            f.write(f">{accession} {name}\n")
+            for i in range(0, len(sequence), line_width):
+                f.write(sequence[i:i + line_width] + "\n")
+
+
+def export_genomes_fasta(path: str = GENOMES_FASTA_FILE, genomes=GENOMES) -> None:
+    """Writes the genomes as loaded for the analysis (cache, seed FASTA or NCBI) to one multi-record FASTA."""
+    write_genomes_fasta(path, genomes, (download_genome(accession) for accession, _ in genomes))
 
 
 def reverse_complement(seq: str) -> str:
     return "".join(NUC_COMPLEMENT.get(b, "N") for b in seq[::-1])
 
 
-def find_palindromic_inverted_repeats(sequence: str, min_len: int = 4, max_len: int = 6):
+def encode_sequence(sequence: str) -> np.ndarray:
+    raw = np.frombuffer(sequence.encode("ascii", errors="replace"), dtype=np.uint8)
+    return BASE_CODES[raw]
+
+
+def palindrome_starts(codes: np.ndarray, min_len: int = 4, max_len: int = 6):
+    """
+    Returns {L: sorted 0-based start positions} of perfect palindromes.
+    A palindrome of even length L is centred between two bases, so every
+    candidate centre is compared against its mirrored (reverse-complemented)
+    neighbours one arm base at a time; lengths are grown from 2 upwards.
+    Odd lengths can never be palindromic (the middle base would have to be
+    its own complement) and get no entry.
+    """
+    starts_by_len = {}
+    n = len(codes)
+    max_half = min(max_len, n) // 2
+    if max_half == 0:
+        return starts_by_len
+
+    arr = codes.astype(np.int16)
+    # centre c sits between bases c-1 and c, for c in 1..n-1
+    centres = np.arange(1, n)
+    open_mask = np.ones(n - 1, dtype=bool)
+    for half in range(1, max_half + 1):
+        j = half - 1
+        # arm bases c-1-j and c+j must exist: c in [half, n-half]
+        open_mask[:half - 1] = False
+        open_mask[n - half:] = False
+        lo, hi = half - 1, n - half
+        if lo >= hi:
+            break
+        left = arr[lo - j:hi - j]
+        right = arr[lo + 1 + j:hi + 1 + j]
+        open_mask[lo:hi] &= (left + right) == 3
+        L = 2 * half
+        if L >= min_len:
+            hits = centres[open_mask] - half
+            if len(hits):
+                starts_by_len[L] = hits
+    return starts_by_len
+
+
+def sites_from_starts(sequence: str, starts_by_len):
     sites_by_len = defaultdict(list)
-    n = len(sequence)
-    for L in range(min_len, max_len + 1):
-        if L > n:
-            continue
-        for i in range(0, n - L + 1):
-            fragment = sequence[i:i + L]
-            if "N" in fragment:
-                continue
-            if fragment == reverse_complement(fragment):
-                start = i + 1
-                end = i + L
-                sites_by_len[L].append((start, end, fragment))
+    for L in sorted(starts_by_len):
+        sites_by_len[L] = [(i + 1, i + L, sequence[i:i + L]) for i in starts_by_len[L].tolist()]
     return sites_by_len
 
 
-def build_report_for_genome(accession: str, name: str, sequence: str, min_len: int, max_len: int) -> str:
-    sites_by_len = find_palindromic_inverted_repeats(sequence, min_len, max_len)
+def find_palindromic_inverted_repeats(sequence: str, min_len: int = 4, max_len: int = 6):
+    starts_by_len = palindrome_starts(encode_sequence(sequence), min_len, max_len)
+    return sites_from_starts(sequence, starts_by_len)
+
+
+class MotifAggregator:
+    """
+    Running summary of the palindromes of one length: total hits, per-motif
+    counts with the position each motif was first seen, the first n_examples
+    hits and an optional uniform reservoir sample. Its size depends only on
+    the number of distinct motifs, never on the number of hits.
+    """
+
+    def __init__(self, length, n_examples=10, reservoir_size=0, seed=None):
+        self.length = length
+        self.n_examples = n_examples
+        self.reservoir_size = reservoir_size
+        self.rng = np.random.default_rng(seed)
+        self.total = 0
+        self.counts = {}
+        self.first_seen = {}
+        self.examples = []
+        self.reservoir_keys = np.zeros(0)
+        self.reservoir_starts = np.zeros(0, dtype=np.int64)
+        self.reservoir_codes = np.zeros(0, dtype=np.int64)
+
+    def decode(self, motif_code):
+        return "".join("ACGT"[(motif_code >> (2 * (self.length - 1 - j))) & 3] for j in range(self.length))
+
+    def add(self, codes, starts):
+        """Feeds the hits at 0-based positions `starts` (ascending) of the encoded genome `codes`."""
+        if not len(starts):
+            return
+        self.total += len(starts)
+        motif_codes = np.zeros(len(starts), dtype=np.int64)
+        for j in range(self.length):
+            motif_codes = (motif_codes << 2) | codes[starts + j]
+        uniq, first_idx, counts = np.unique(motif_codes, return_index=True, return_counts=True)
+        for motif_code, idx, count in zip(uniq.tolist(), first_idx.tolist(), counts.tolist()):
+            first = int(starts[idx])
+            self.counts[motif_code] = self.counts.get(motif_code, 0) + count
+            self.first_seen[motif_code] = min(self.first_seen.get(motif_code, first), first)
+
+        head = zip(starts[:self.n_examples].tolist(), motif_codes[:self.n_examples].tolist())
+        self._merge_examples([(i + 1, i + self.length, self.decode(code)) for i, code in head])
+        if self.reservoir_size:
+            self._merge_reservoir(self.rng.random(len(starts)), starts, motif_codes)
+
+    def merge(self, other):
+        self.total += other.total
+        for motif_code, count in other.counts.items():
+            self.counts[motif_code] = self.counts.get(motif_code, 0) + count
+            first = other.first_seen[motif_code]
+            self.first_seen[motif_code] = min(self.first_seen.get(motif_code, first), first)
+        self._merge_examples(other.examples)
+        if self.reservoir_size:
+            self._merge_reservoir(other.reservoir_keys, other.reservoir_starts, other.reservoir_codes)
+
+    def _merge_examples(self, examples):
+        if examples and (len(self.examples) < self.n_examples or examples[0] < self.examples[-1]):
+            self.examples = sorted(self.examples + examples)[:self.n_examples]
+
+    def _merge_reservoir(self, keys, starts, motif_codes):
+        # bottom-k sampling: the k smallest random keys form a uniform sample of every hit seen
+        keys = np.concatenate([self.reservoir_keys, keys])
+        keep = np.argsort(keys, kind="stable")[:self.reservoir_size]
+        self.reservoir_keys = keys[keep]
+        self.reservoir_starts = np.concatenate([self.reservoir_starts, starts])[keep]
+        self.reservoir_codes = np.concatenate([self.reservoir_codes, motif_codes])[keep]
+
+    def top_motifs(self, n=10):
+        # same order as Counter.most_common: count descending, ties by first appearance
+        ranked = sorted(self.counts, key=lambda code: (-self.counts[code], self.first_seen[code]))
+        return [(self.decode(code), self.counts[code]) for code in ranked[:n]]
+
+    def sample(self):
+        order = np.argsort(self.reservoir_starts)
+        hits = zip(self.reservoir_starts[order].tolist(), self.reservoir_codes[order].tolist())
+        return [(i + 1, i + self.length, self.decode(code)) for i, code in hits]
+
+
+def stream_palindrome_aggregators(codes: np.ndarray, min_len: int, max_len: int, chunk_size: int = CHUNK_SIZE,
+                                  n_examples: int = 10, reservoir_size: int = RESERVOIR_SIZE, seed=None):
+    aggregators = {L: MotifAggregator(L, n_examples, reservoir_size, seed) for L in range(min_len, max_len + 1)}
+    n = len(codes)
+    for lo in range(0, n, chunk_size):
+        hits = _scan_chunk(codes, lo, min(n, lo + chunk_size), "palindromic", (min_len, max_len))
+        for L, starts in hits.items():
+            aggregators[L].add(codes, starts)
+    return aggregators
+
+
+def kmer_codes(codes: np.ndarray, k: int):
+    """
+    Rolling 2-bit codes of every forward k-mer and of its reverse complement,
+    plus a mask of windows that contain only A/C/G/T. k must be <= 31.
+    """
+    m = len(codes) - k + 1
+    if m <= 0:
+        empty = np.zeros(0, dtype=np.uint64)
+        return empty, empty, np.zeros(0, dtype=bool)
+    clipped = np.minimum(codes, 3).astype(np.uint64)
+    fwd = np.zeros(m, dtype=np.uint64)
+    rev = np.zeros(m, dtype=np.uint64)
+    for j in range(k):
+        window = clipped[j:j + m]
+        fwd = (fwd << np.uint64(2)) | window
+        rev |= (np.uint64(3) - window) << np.uint64(2 * j)
+    bad = np.concatenate(([0], np.cumsum(codes == INVALID_CODE)))
+    valid = (bad[k:] - bad[:m]) == 0
+    return fwd, rev, valid
+
+
+def gapped_inverted_repeats(codes: np.ndarray, arm_len: int, min_spacer: int, max_spacer: int,
+                            max_mismatches: int, batch_size: int = 1_000_000):
+    """
+    Finds every left arm start i and spacer s such that the right arm
+    codes[i+arm_len+s : i+2*arm_len+s] is the reverse complement of the left arm
+    with at most max_mismatches substitutions.
+
+    Candidates come from a hashed seed index: the arm is split into
+    max_mismatches + 1 blocks, so at least one block matches exactly
+    (pigeonhole). Each block's forward k-mer is looked up among the
+    reverse-complement k-mers that lie in the allowed spacer window, and only
+    those (i, s) pairs are verified base by base. Runtime is dominated by one
+    sort of the k-mer index, not by the number of (length, spacer) combinations.
+
+    Returns (starts, spacers, mismatches) as arrays sorted by start, then spacer.
+    """
+    if arm_len <= 0 or min_spacer < 0 or max_spacer < min_spacer or max_mismatches < 0:
+        raise ValueError("Invalid gapped inverted repeat parameters.")
+    n = len(codes)
+    block = arm_len // (max_mismatches + 1)
+    if block == 0:
+        raise ValueError("Mismatch budget too large for the arm length (need at least 1 exact base per block).")
+    k = min(block, 31)
+
+    empty = np.zeros(0, dtype=np.int64)
+    fwd, rev, valid = kmer_codes(codes, k)
+    if not len(fwd):
+        return empty, empty, empty
+
+    # Index of reverse-complement k-mers sorted by (code rank, position)
+    positions = np.flatnonzero(valid)
+    stride = np.int64(n + 1)
+    if k <= 12:
+        # the code itself is a dense rank; a stable (radix) sort on it keeps positions ordered
+        rank_dtype = np.uint16 if k <= 8 else np.uint32
+        rc_rank = rev[positions].astype(rank_dtype)
+        fwd_rank = fwd[positions].astype(rank_dtype)
+        fwd_pos = positions
+    else:
+        vocab, rc_rank = np.unique(rev[positions], return_inverse=True)
+        fwd_rank = np.searchsorted(vocab, fwd[positions])
+        known = fwd_rank < len(vocab)
+        known[known] = vocab[fwd_rank[known]] == fwd[positions[known]]
+        fwd_rank = fwd_rank[known]
+        fwd_pos = positions[known]
+    order = np.argsort(rc_rank, kind="stable")
+    rc_pos = positions[order]
+    rc_keys = rc_rank[order].astype(np.int64) * stride + rc_pos
+    # searching with sorted needles keeps the binary searches cache friendly
+    order = np.argsort(fwd_rank, kind="stable")
+    fwd_pos = fwd_pos[order]
+    fwd_base = fwd_rank[order].astype(np.int64) * stride
+
+    candidate_keys = []
+    span = max_spacer - min_spacer + 1
+    for b in range(max_mismatches + 1):
+        offset = b * block
+        # right-arm block position q relative to left-arm block position p
+        shift = 2 * arm_len - 2 * offset - k
+        # shift >= k, so the window never starts below 0; clamp its end to stay inside the code's group
+        window_lo = np.minimum(fwd_pos + shift + min_spacer, n)
+        window_hi = np.minimum(fwd_pos + shift + max_spacer, n)
+        lo = np.searchsorted(rc_keys, fwd_base + window_lo, side="left")
+        hi = np.searchsorted(rc_keys, fwd_base + window_hi, side="right")
+        counts = hi - lo
+        has = np.flatnonzero(counts)
+        for s0 in range(0, len(has), batch_size):
+            sel = has[s0:s0 + batch_size]
+            c = counts[sel]
+            total = int(c.sum())
+            first = np.repeat(lo[sel] - (np.cumsum(c) - c), c)
+            q = rc_pos[first + np.arange(total)]
+            p = np.repeat(fwd_pos[sel], c)
+            starts = p - offset
+            spacers = q - p - shift
+            ok = (starts >= 0) & (starts + 2 * arm_len + spacers <= n)
+            candidate_keys.append(starts[ok] * span + (spacers[ok] - min_spacer))
+
+    if not candidate_keys:
+        return empty, empty, empty
+    keys = np.unique(np.concatenate(candidate_keys))
+    starts = keys // span
+    spacers = keys % span + min_spacer
+
+    arr = codes.astype(np.int16)
+    mismatches = np.zeros(len(starts), dtype=np.int64)
+    right_end = starts + 2 * arm_len + spacers - 1
+    for t in range(arm_len):
+        mismatches += (arr[starts + t] + arr[right_end - t]) != 3
+    keep = mismatches <= max_mismatches
+    return starts[keep], spacers[keep], mismatches[keep]
+
+
+def find_gapped_inverted_repeats(sequence: str, arm_len: int = GAPPED_ARM_LEN, min_spacer: int = GAPPED_MIN_SPACER,
+                                 max_spacer: int = GAPPED_MAX_SPACER, max_mismatches: int = GAPPED_MAX_MISMATCHES):
+    """
+    Returns (left_start, left_end, right_start, right_end, spacer, mismatches, left_arm, right_arm)
+    tuples with 1-based inclusive coordinates, ordered by left start and spacer.
+    """
+    starts, spacers, mismatches = gapped_inverted_repeats(
+        encode_sequence(sequence), arm_len, min_spacer, max_spacer, max_mismatches)
+    return gapped_sites_from_arrays(sequence, arm_len, starts, spacers, mismatches)
+
+
+def gapped_sites_from_arrays(sequence: str, arm_len: int, starts, spacers, mismatches):
+    sites = []
+    for i, s, mm in zip(starts.tolist(), spacers.tolist(), mismatches.tolist()):
+        j = i + arm_len + s
+        sites.append((i + 1, i + arm_len, j + 1, j + arm_len, s, mm,
+                      sequence[i:i + arm_len], sequence[j:j + arm_len]))
+    return sites
+
+
+def _scan_chunk(codes: np.ndarray, lo: int, hi: int, mode: str, params):
+    """
+    Scans codes[lo:hi] plus the overlap a hit starting before hi can reach.
+    Hits are kept only if they start inside [lo, hi), so the overlap with the
+    next chunk never produces duplicates.
+    """
+    n = len(codes)
+    if mode == "streaming":
+        min_len, max_len, n_examples, reservoir_size, seed = params
+        aggregators = {L: MotifAggregator(L, n_examples, reservoir_size, None if seed is None else [seed, lo])
+                       for L in range(min_len, max_len + 1)}
+        for L, starts in _scan_chunk(codes, lo, hi, "palindromic", (min_len, max_len)).items():
+            aggregators[L].add(codes, starts)
+        return aggregators
+    if mode == "palindromic":
+        min_len, max_len = params
+        starts_by_len = palindrome_starts(codes[lo:min(n, hi + max_len - 1)], min_len, max_len)
+        result = {}
+        for L, starts in starts_by_len.items():
+            starts = starts[starts < hi - lo] + lo
+            if len(starts):
+                result[L] = starts
+        return result
+    arm_len, min_spacer, max_spacer, max_mismatches = params
+    view = codes[lo:min(n, hi + 2 * arm_len + max_spacer - 1)]
+    starts, spacers, mismatches = gapped_inverted_repeats(view, arm_len, min_spacer, max_spacer, max_mismatches)
+    owned = starts < hi - lo
+    return starts[owned] + lo, spacers[owned], mismatches[owned]
+
+
+def _scan_shared_chunk(task):
+    # The genome codes live in shared memory; only the block name and the chunk bounds reach the worker.
+    shm_name, n, lo, hi, mode, params = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        return _scan_chunk(np.ndarray((n,), dtype=np.uint8, buffer=shm.buf), lo, hi, mode, params)
+    finally:
+        shm.close()
+
+
+def parallel_scan(sequences, mode: str, params, workers: int, chunk_size: int = CHUNK_SIZE):
+    """
+    Scans several genomes at once on a process pool, fanning out over genomes
+    and over overlapping chunks of each genome. Returns one result per input
+    sequence, identical to the serial palindrome_starts /
+    gapped_inverted_repeats output.
+    """
+    blocks = []
+    tasks = []
+    owners = []
+    try:
+        for g, sequence in enumerate(sequences):
+            codes = encode_sequence(sequence)
+            n = len(codes)
+            shm = shared_memory.SharedMemory(create=True, size=max(n, 1))
+            blocks.append(shm)
+            np.ndarray((n,), dtype=np.uint8, buffer=shm.buf)[:] = codes
+            for lo in range(0, n, chunk_size):
+                tasks.append((shm.name, n, lo, min(n, lo + chunk_size), mode, params))
+                owners.append(g)
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk_results = list(pool.map(_scan_shared_chunk, tasks))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    # chunks were queued in genome and position order, so concatenating keeps hits sorted
+    merged = []
+    for g in range(len(sequences)):
+        parts = [res for owner, res in zip(owners, chunk_results) if owner == g]
+        if mode == "streaming":
+            aggregators = parts[0] if parts else {}
+            for part in parts[1:]:
+                for L, aggregator in part.items():
+                    aggregators[L].merge(aggregator)
+            merged.append(aggregators)
+        elif mode == "palindromic":
+            starts_by_len = {}
+            for L in sorted({L for part in parts for L in part}):
+                starts_by_len[L] = np.concatenate([part[L] for part in parts if L in part])
+            merged.append(starts_by_len)
+        else:
+            empty = np.zeros(0, dtype=np.int64)
+            merged.append(tuple(np.concatenate([empty] + [part[i] for part in parts]) for i in range(3)))
+    return merged
+
+
+def build_report_for_genome(accession: str, name: str, sequence: str, min_len: int, max_len: int,
+                            sites_by_len=None, streaming: bool = False, aggregators=None) -> str:
+    if aggregators is None and streaming:
+        aggregators = stream_palindrome_aggregators(encode_sequence(sequence), min_len, max_len)
+    if aggregators is None and sites_by_len is None:
+        sites_by_len = find_palindromic_inverted_repeats(sequence, min_len, max_len)
     lines = []
     lines.append(f"Genome: {name} ({accession})")
     lines.append(f"Length: {len(sequence)} bp")
@@ -58,22 +640,29 @@ def build_report_for_genome(accession: str, name: str, sequence: str, min_len: i
     lines.append("")
 
     for L in range(min_len, max_len + 1):
-        sites = sites_by_len.get(L, [])
+        if aggregators is not None:
+            aggregator = aggregators.get(L) or MotifAggregator(L)
+            total, distinct = aggregator.total, len(aggregator.counts)
+            top_motifs, examples = aggregator.top_motifs(10), aggregator.examples[:10]
+        else:
+            sites = sites_by_len.get(L, [])
+            motif_counter = Counter(site[2] for site in sites)
+            total, distinct = len(sites), len(motif_counter)
+            top_motifs, examples = motif_counter.most_common(10), sites[:10]
         lines.append(f"Motif length {L}:")
-        lines.append(f"  Total palindromic inverted repeats: {len(sites)}")
-        if not sites:
+        lines.append(f"  Total palindromic inverted repeats: {total}")
+        if not total:
             lines.append("")
             continue
 
-        motif_counter = Counter(site[2] for site in sites)
-        lines.append(f"  Distinct motifs: {len(motif_counter)}")
+        lines.append(f"  Distinct motifs: {distinct}")
 
         lines.append("  Top motifs (motif : count):")
-        for motif, count in motif_counter.most_common(10):
+        for motif, count in top_motifs:
             lines.append(f"    {motif} : {count}")
 
         lines.append("  Example positions (start-end, motif):")
-        for start, end, motif in sites[:10]:
+        for start, end, motif in examples:
             lines.append(f"    {start}-{end}, {motif}")
 
         lines.append("")
@@ -83,19 +672,77 @@ def build_report_for_genome(accession: str, name: str, sequence: str, min_len: i
     return "\n".join(lines)
 
 
-def main():
+def build_gapped_report_for_genome(accession: str, name: str, sequence: str, arm_len: int,
+                                   min_spacer: int, max_spacer: int, max_mismatches: int, sites=None) -> str:
+    if sites is None:
+        sites = find_gapped_inverted_repeats(sequence, arm_len, min_spacer, max_spacer, max_mismatches)
+    lines = []
+    lines.append(f"Genome: {name} ({accession})")
+    lines.append(f"Length: {len(sequence)} bp")
+    lines.append(f"Inverted repeat search: gapped arms, arm length {arm_len}, "
+                 f"spacer {min_spacer}-{max_spacer}, max mismatches {max_mismatches}")
+    lines.append("")
+
+    lines.append(f"Arm length {arm_len}:")
+    lines.append(f"  Total gapped inverted repeats: {len(sites)}")
+    if sites:
+        arm_counter = Counter(site[6] for site in sites)
+        lines.append(f"  Distinct left arms: {len(arm_counter)}")
+
+        lines.append("  Top left arms (arm : count):")
+        for arm, count in arm_counter.most_common(10):
+            lines.append(f"    {arm} : {count}")
+
+        lines.append("  Example positions (left start-end, right start-end, spacer, mismatches, left arm):")
+        for left_start, left_end, right_start, right_end, spacer, mm, arm, _ in sites[:10]:
+            lines.append(f"    {left_start}-{left_end}, {right_start}-{right_end}, {spacer}, {mm}, {arm}")
+    lines.append("")
+
+    lines.append("-" * 60)
+    lines.append("")
+    return "\n".join(lines)
+
+
+def main(mode: str = SEARCH_MODE, workers: int = WORKERS, streaming: bool = STREAMING_REPORT,
+         export_fasta: bool = EXPORT_FASTA):
     min_len = 4
     max_len = 6
-    all_reports = []
+    gapped_params = (GAPPED_ARM_LEN, GAPPED_MIN_SPACER, GAPPED_MAX_SPACER, GAPPED_MAX_MISMATCHES)
+    if mode not in ("palindromic", "gapped"):
+        raise ValueError(f"Unknown search mode: {mode}")
+
+    sequences = [download_genome(accession) for accession, _ in GENOMES]
+    if export_fasta:
+        write_genomes_fasta(GENOMES_FASTA_FILE, GENOMES, sequences)
+    streaming = streaming and mode == "palindromic"
+    if workers > 1:
+        if streaming:
+            scans = parallel_scan(sequences, "streaming", (min_len, max_len, 10, RESERVOIR_SIZE, None), workers)
+        else:
+            params = gapped_params if mode == "gapped" else (min_len, max_len)
+            scans = parallel_scan(sequences, mode, params, workers)
+    else:
+        scans = [None] * len(sequences)
 
-    for accession, name in GENOMES:
-        sequence = download_genome(accession)
-        report = build_report_for_genome(accession, name, sequence, min_len, max_len)
+    all_reports = []
+    for (accession, name), sequence, scan in zip(GENOMES, sequences, scans):
+        if mode == "gapped":
+            sites = None if scan is None else gapped_sites_from_arrays(sequence, GAPPED_ARM_LEN, *scan)
+            report = build_gapped_report_for_genome(accession, name, sequence, *gapped_params, sites=sites)
+        elif streaming:
+            report = build_report_for_genome(accession, name, sequence, min_len, max_len,
+                                             streaming=True, aggregators=scan)
+        else:
+            sites_by_len = None if scan is None else sites_from_starts(sequence, scan)
+            report = build_report_for_genome(accession, name, sequence, min_len, max_len, sites_by_len=sites_by_len)
         all_reports.append(report)
 
     with open(REPORT_FILE, "w", encoding="utf-8") as f:
         f.write("Inverted repeat analysis for three bacterial genomes\n")
-        f.write("Possible transposon-related palindromic signals, no prior motif knowledge\n")
+        if mode == "gapped":
+            f.write("Possible transposon terminal inverted repeats (arm, spacer, mismatches), no prior motif knowledge\n")
+        else:
+            f.write("Possible transposon-related palindromic signals, no prior motif knowledge\n")
         f.write("=" * 70 + "\n\n")
         for rep in all_reports:
             f.write(rep)
@@ -1,7 +1,12 @@
 import random
+from collections import deque
+
+import numpy as np
 
 NUCS = ["A", "C", "G", "T"]
 
+NUC_COMPLEMENT = {"A": "T", "C": "G", "G": "C", "T": "A"}
+
 TRANSPOSONS = [
     "TACGTACGTA",
     "GGCATGCAAGT",
@@ -9,11 +14,30 @@ TRANSPOSONS = [
     "CCGTTAGC"
 ]
 
+MAX_APPROX_PATTERN_LEN = 64
+
+BASE_LETTERS = np.frombuffer(b"ACGT", dtype=np.uint8)
+BASE_CODES = np.full(256, 255, dtype=np.uint8)
+BASE_CODES[BASE_LETTERS] = np.arange(4, dtype=np.uint8)
+
+# One row per inserted copy in a synthetic genome; strand is +1 / -1.
+TRUTH_DTYPE = np.dtype([("start", np.int64), ("end", np.int64), ("te", np.int32),
+                        ("strand", np.int8), ("substitutions", np.int32)])
+SYNTHETIC_BLOCK_SIZE = 4_000_000
+
 def random_dna(length: int) -> str:
     return "".join(random.choice(NUCS) for _ in range(length))
 
-def build_artificial_sequence(min_len=200, max_len=400, n_tes=3):
-    random.seed(42)
+def mutate(seq: str, rate: float) -> str:
+    # substitutions only, so inserted copies keep their length and truth coordinates
+    bases = list(seq)
+    for i, b in enumerate(bases):
+        if random.random() < rate:
+            bases[i] = random.choice([n for n in NUCS if n != b])
+    return "".join(bases)
+
+def build_artificial_sequence(min_len=200, max_len=400, n_tes=3, mutation_rate=0.0, seed=42):
+    random.seed(seed)
     total_len = random.randint(min_len, max_len)
     chosen_tes = random.sample(TRANSPOSONS, n_tes)
     total_te_len = sum(len(te) for te in chosen_tes)
@@ -21,20 +45,180 @@ def build_artificial_sequence(min_len=200, max_len=400, n_tes=3):
     if background_len < 0:
         raise ValueError("Sequence too short for the selected number of transposons.")
     background = random_dna(background_len)
-    seq_list = list(background)
+    pieces = []
     true_positions = []
-    insert_positions = sorted(random.sample(range(len(seq_list) + 1), n_tes))
+    insert_positions = sorted(random.sample(range(len(background) + 1), n_tes))
+    prev = 0
     offset = 0
     for insert_index, te in zip(insert_positions, chosen_tes):
+        pieces.append(background[prev:insert_index])
+        pieces.append(mutate(te, mutation_rate) if mutation_rate > 0 else te)
         pos = insert_index + offset
-        seq_list[pos:pos] = list(te)
-        start = pos
-        end = pos + len(te) - 1
-        true_positions.append((start, end, te))
+        true_positions.append((pos, pos + len(te) - 1, te))
+        prev = insert_index
         offset += len(te)
-    final_seq = "".join(seq_list)
+    pieces.append(background[prev:])
+    final_seq = "".join(pieces)
     return final_seq, true_positions
 
+def base_probabilities(gc_content=0.5):
+    at = (1.0 - gc_content) / 2
+    gc = gc_content / 2
+    return np.array([at, gc, gc, at])
+
+MARKOV_SEGMENT = 256
+
+def _build_map_composition():
+    # A map {0..3} -> {0..3} is packed into one byte, 2 bits per source state.
+    # COMPOSE[f, g] is the packed map of "apply g, then f".
+    f = np.arange(256, dtype=np.int32)[:, None]
+    g = np.arange(256, dtype=np.int32)[None, :]
+    h = np.zeros((256, 256), dtype=np.int32)
+    for state in range(4):
+        h |= ((f >> (2 * ((g >> (2 * state)) & 3))) & 3) << (2 * state)
+    return h.astype(np.uint8)
+
+IDENTITY_MAP = 0b11100100
+COMPOSE_MAPS = _build_map_composition()
+
+def _sample_background(length, rng, gc_content, transition_matrix, prev_state):
+    """
+    Draws `length` background codes. Without a transition matrix bases are
+    independent with the requested GC content. With a column-stochastic 4x4
+    matrix (column = current base, row = next base, as in the L13 Markov labs)
+    a first-order Markov chain is sampled: each uniform draw becomes a packed
+    map "previous base -> next base", the maps of every MARKOV_SEGMENT-long
+    segment are composed side by side with one table lookup per step, segment
+    entry states are chained once per segment, and the bases are then filled
+    in for all segments in parallel.
+    """
+    u = rng.random(length, dtype=np.float32)
+    if transition_matrix is None:
+        cdf = np.cumsum(base_probabilities(gc_content))[:3].astype(np.float32)
+        return (u >= cdf[0]).astype(np.uint8) + (u >= cdf[1]) + (u >= cdf[2])
+
+    matrix = np.asarray(transition_matrix, dtype=float)
+    cdf = (np.cumsum(matrix, axis=0) / matrix.sum(axis=0)).T.astype(np.float32)
+    n_seg = -(-length // MARKOV_SEGMENT)
+    maps = np.full(n_seg * MARKOV_SEGMENT, IDENTITY_MAP, dtype=np.uint8)
+    maps[:length] = 0
+    for state in range(4):
+        nxt = (u >= cdf[state, 0]).astype(np.uint8) + (u >= cdf[state, 1]) + (u >= cdf[state, 2])
+        maps[:length] |= nxt << (2 * state)
+    # row t holds the t-th map of every segment
+    maps = np.ascontiguousarray(maps.reshape(n_seg, MARKOV_SEGMENT).T)
+
+    composed = np.full(n_seg, IDENTITY_MAP, dtype=np.uint8)
+    for t in range(MARKOV_SEGMENT):
+        composed = COMPOSE_MAPS[maps[t], composed]
+
+    if prev_state is None:
+        prev_state = int(rng.choice(4, p=base_probabilities(gc_content)))
+    entry = np.empty(n_seg, dtype=np.uint8)
+    state = prev_state
+    for g, packed in enumerate(composed.tolist()):
+        entry[g] = state
+        state = (packed >> (2 * state)) & 3
+
+    out = np.empty((MARKOV_SEGMENT, n_seg), dtype=np.uint8)
+    state = entry
+    for t in range(MARKOV_SEGMENT):
+        state = (maps[t] >> (2 * state)) & 3
+        out[t] = state
+    return out.T.reshape(-1)[:length]
+
+def iter_synthetic_genome(length, patterns=TRANSPOSONS, n_insertions=10, gc_content=0.5, transition_matrix=None,
+                          divergence=0.0, reverse_fraction=0.5, seed=None, block_size=SYNTHETIC_BLOCK_SIZE):
+    """
+    Vectorized replacement for build_artificial_sequence at genome scale.
+    Returns (blocks, truth), sequence first like build_artificial_sequence: an
+    iterator over consecutive uint8 code blocks (A=0, C=1, G=2, T=3) of the final
+    sequence, so callers can stream it without holding it in memory, and the truth
+    table of inserted copies (TRUTH_DTYPE, 0-based inclusive coordinates in the
+    final sequence).
+    """
+    rng = np.random.default_rng(seed)
+    pattern_codes = [BASE_CODES[np.frombuffer(te.encode("ascii"), dtype=np.uint8)] for te in patterns]
+    if any((pc == 255).any() for pc in pattern_codes):
+        raise ValueError("Transposon patterns must contain only A/C/G/T.")
+    lengths = np.array([len(pc) for pc in pattern_codes], dtype=np.int64)
+
+    te_index = rng.integers(0, len(patterns), n_insertions)
+    strand = np.where(rng.random(n_insertions) < reverse_fraction, -1, 1).astype(np.int8)
+    te_len = lengths[te_index]
+    background_len = length - int(te_len.sum())
+    if background_len < 0:
+        raise ValueError("Sequence too short for the selected number of transposons.")
+    points = np.sort(rng.integers(0, background_len + 1, n_insertions))
+
+    copies = [pattern_codes[i] if s > 0 else 3 - pattern_codes[i][::-1] for i, s in zip(te_index.tolist(), strand)]
+    inserted = np.concatenate(copies) if copies else np.zeros(0, dtype=np.uint8)
+    copy_offsets = np.concatenate(([0], np.cumsum(te_len)))
+    mutated = rng.random(len(inserted)) < divergence
+    inserted[mutated] = (inserted[mutated] + rng.integers(1, 4, int(mutated.sum()), dtype=np.uint8)) % 4
+    substitutions = np.zeros(n_insertions, dtype=np.int64)
+    if n_insertions:
+        substitutions = np.add.reduceat(mutated.astype(np.int64), copy_offsets[:-1])
+
+    truth = np.zeros(n_insertions, dtype=TRUTH_DTYPE)
+    truth["start"] = points + copy_offsets[:-1]
+    truth["end"] = truth["start"] + te_len - 1
+    truth["te"] = te_index
+    truth["strand"] = strand
+    truth["substitutions"] = substitutions
+
+    def blocks():
+        prev_state = None
+        k = 0
+        for b0 in range(0, background_len + 1, block_size):
+            b1 = min(b0 + block_size, background_len)
+            background = _sample_background(b1 - b0, rng, gc_content, transition_matrix, prev_state)
+            if len(background):
+                prev_state = int(background[-1])
+            # insertions at the very end of the background belong to the last block
+            stop = np.searchsorted(points, b1, side="right" if b1 == background_len else "left")
+            pieces = []
+            prev = b0
+            for j in range(k, stop):
+                point = int(points[j])
+                pieces.append(background[prev - b0:point - b0])
+                pieces.append(inserted[copy_offsets[j]:copy_offsets[j + 1]])
+                prev = point
+            pieces.append(background[prev - b0:])
+            k = stop
+            yield np.concatenate(pieces)
+            if b1 == background_len:
+                break
+
+    return blocks(), truth
+
+def generate_synthetic_genome(length, **options):
+    blocks, truth = iter_synthetic_genome(length, **options)
+    return np.concatenate(list(blocks)), truth
+
+def decode_codes(codes) -> str:
+    return BASE_LETTERS[codes].tobytes().decode("ascii")
+
+def write_fasta_blocks(path, blocks, name="synthetic", line_width=80):
+    with open(path, "wb") as f:
+        f.write(f">{name}\n".encode("ascii"))
+        carry = np.zeros(0, dtype=np.uint8)
+        for block in blocks:
+            letters = np.concatenate([carry, BASE_LETTERS[block]])
+            n_lines = len(letters) // line_width
+            body = letters[:n_lines * line_width].reshape(n_lines, line_width)
+            newline = np.full((n_lines, 1), ord("\n"), dtype=np.uint8)
+            f.write(np.hstack([body, newline]).tobytes())
+            carry = letters[n_lines * line_width:]
+        if len(carry):
+            f.write(carry.tobytes() + b"\n")
+
+def write_synthetic_fasta(path, length, name="synthetic", line_width=80, **options):
+    """Streams a synthetic genome straight to FASTA; returns its truth table."""
+    blocks, truth = iter_synthetic_genome(length, **options)
+    write_fasta_blocks(path, blocks, name, line_width)
+    return truth
+
 def find_all_occurrences(sequence: str, pattern: str):
     results = []
     start = 0
@@ -46,14 +230,214 @@ def find_all_occurrences(sequence: str, pattern: str):
         start = idx + 1
     return results
 
-def detect_transposons(sequence: str, patterns):
-    detections = []
-    for te in patterns:
-        positions = find_all_occurrences(sequence, te)
-        for (s, e) in positions:
-            detections.append((te, s, e))
-    detections.sort(key=lambda x: x[1])
-    return detections
+def mismatch_occurrences(sequence: str, pattern: str, max_mismatches: int):
+    """
+    Bit-parallel (shift-and with k+1 error levels) search for every window of
+    len(pattern) bases with at most max_mismatches substitutions.
+    Returns (start, end, mismatches) for every such window.
+    """
+    m = len(pattern)
+    if not 0 < m <= MAX_APPROX_PATTERN_LEN:
+        raise ValueError(f"Pattern length must be between 1 and {MAX_APPROX_PATTERN_LEN}.")
+    full = (1 << m) - 1
+    high = 1 << (m - 1)
+    masks = {}
+    for i, ch in enumerate(pattern):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+
+    levels = range(1, max_mismatches + 1)
+    state = [0] * (max_mismatches + 1)
+    results = []
+    for j, ch in enumerate(sequence):
+        eq = masks.get(ch, 0)
+        prev_old = state[0]
+        state[0] = ((prev_old << 1) | 1) & eq
+        for d in levels:
+            old = state[d]
+            state[d] = ((((old << 1) | 1) & eq) | ((prev_old << 1) | 1)) & full
+            prev_old = old
+        if state[max_mismatches] & high:
+            d = 0
+            while not state[d] & high:
+                d += 1
+            results.append((j - m + 1, j, d))
+    return results
+
+def _edit_alignment_start(sequence: str, end: int, pattern: str, distance: int):
+    # banded backwards DP: where does the best alignment of the whole pattern ending at `end` begin?
+    m = len(pattern)
+    lo = max(0, end - m - distance + 1)
+    text = sequence[lo:end + 1][::-1]
+    pat = pattern[::-1]
+    prev = list(range(m + 1))
+    best_start, best_cost = end - m + 1, None
+    for j, ch in enumerate(text, start=1):
+        cur = [j] + [0] * m
+        for i in range(1, m + 1):
+            cur[i] = min(prev[i] + 1, cur[i - 1] + 1, prev[i - 1] + (pat[i - 1] != ch))
+        if cur[m] <= distance and (best_cost is None or cur[m] < best_cost):
+            best_start, best_cost = end - j + 1, cur[m]
+        prev = cur
+    return best_start
+
+def edit_occurrences(sequence: str, pattern: str, max_edits: int):
+    """
+    Myers' bit-vector algorithm: the edit distance of the pattern against the
+    best substring ending at every position, one machine word of state per base.
+    Runs of consecutive end positions within max_edits are one hit; the best
+    end of each run is reported as (start, end, edits).
+    """
+    m = len(pattern)
+    if not 0 < m <= MAX_APPROX_PATTERN_LEN:
+        raise ValueError(f"Pattern length must be between 1 and {MAX_APPROX_PATTERN_LEN}.")
+    full = (1 << m) - 1
+    high = 1 << (m - 1)
+    peq = {}
+    for i, ch in enumerate(pattern):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+
+    pv, mv, score = full, 0, m
+    ends = []
+    for j, ch in enumerate(sequence):
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = (ph << 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+        if score <= max_edits:
+            ends.append((j, score))
+
+    results = []
+    run_best = None
+    for k, (j, score) in enumerate(ends):
+        if run_best is None or score < run_best[1]:
+            run_best = (j, score)
+        if k + 1 == len(ends) or ends[k + 1][0] != j + 1:
+            end, edits = run_best
+            results.append((_edit_alignment_start(sequence, end, pattern, edits), end, edits))
+            run_best = None
+    return results
+
+def reverse_complement(seq: str) -> str:
+    return "".join(NUC_COMPLEMENT.get(b, "N") for b in reversed(seq))
+
+class TransposonAutomaton:
+    """
+    Aho-Corasick automaton over a transposon library. The goto/failure
+    structure is flattened into a full transition table, so scanning costs one
+    table lookup per base no matter how many patterns there are, and every
+    occurrence (overlapping ones included) of every pattern is reported in a
+    single pass. With both_strands=True the reverse complement of every
+    non-palindromic pattern is added as well and its hits are marked "-".
+    """
+
+    def __init__(self, patterns, both_strands=False):
+        self.patterns = list(patterns)
+        if any(not te for te in self.patterns):
+            raise ValueError("Transposon patterns must be non-empty.")
+        keys = [(te, idx, "+") for idx, te in enumerate(self.patterns)]
+        if both_strands:
+            for idx, te in enumerate(self.patterns):
+                rc = reverse_complement(te)
+                if rc != te:
+                    keys.append((rc, idx, "-"))
+
+        alphabet = sorted({ch for key, _, _ in keys for ch in key})
+        self.symbol_index = {ch: i for i, ch in enumerate(alphabet)}
+        # one extra column for symbols that occur in no pattern: they always lead back to the root
+        self.width = len(alphabet) + 1
+
+        goto = [{}]
+        outputs = [[]]
+        for key, idx, strand in keys:
+            node = 0
+            for ch in key:
+                c = self.symbol_index[ch]
+                if c not in goto[node]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[node][c] = len(goto) - 1
+                node = goto[node][c]
+            outputs[node].append((idx, strand, len(key)))
+
+        delta = [0] * (len(goto) * self.width)
+        fail = [0] * len(goto)
+        queue = deque()
+        for c in range(self.width - 1):
+            child = goto[0].get(c)
+            if child is not None:
+                delta[c] = child
+                queue.append(child)
+        while queue:
+            node = queue.popleft()
+            outputs[node] = outputs[node] + outputs[fail[node]]
+            base = node * self.width
+            fail_base = fail[node] * self.width
+            for c in range(self.width - 1):
+                child = goto[node].get(c)
+                if child is None:
+                    delta[base + c] = delta[fail_base + c]
+                else:
+                    fail[child] = delta[fail_base + c]
+                    delta[base + c] = child
+                    queue.append(child)
+        self.delta = delta
+        self.outputs = outputs
+
+    def scan(self, sequence: str):
+        """Yields (pattern index, start, end, strand) in the order the hits end along the sequence."""
+        delta = self.delta
+        outputs = self.outputs
+        width = self.width
+        other = width - 1
+        symbol_index = self.symbol_index
+        state = 0
+        for i, ch in enumerate(sequence):
+            state = delta[state * width + symbol_index.get(ch, other)]
+            if outputs[state]:
+                for idx, strand, length in outputs[state]:
+                    yield idx, i - length + 1, i, strand
+
+def detect_transposons_approx(sequence: str, patterns, max_errors, error_model="mismatch", both_strands=False):
+    search = {"mismatch": mismatch_occurrences, "edit": edit_occurrences}.get(error_model)
+    if search is None:
+        raise ValueError(f"Unknown error model: {error_model}")
+    hits = []
+    for idx, te in enumerate(patterns):
+        for start, end, distance in search(sequence, te, max_errors):
+            hits.append((start, idx, 0, (te, start, end, "+", distance)))
+        rc = reverse_complement(te)
+        if both_strands and rc != te:
+            for start, end, distance in search(sequence, rc, max_errors):
+                hits.append((start, idx, 1, (te, start, end, "-", distance)))
+    hits.sort(key=lambda hit: hit[:3])
+    if both_strands:
+        return [hit[3] for hit in hits]
+    return [(te, start, end, distance) for _, _, _, (te, start, end, _, distance) in hits]
+
+def detect_transposons(sequence: str, patterns, both_strands=False, max_errors=0, error_model="mismatch"):
+    """
+    Returns (te, start, end) hits sorted by start, ties in library order.
+    With both_strands=True reverse-strand hits are included and each hit
+    becomes (te, start, end, strand). With max_errors > 0 copies within that
+    many mismatches (error_model="mismatch") or edits ("edit") are reported
+    and the distance is appended to every hit.
+    """
+    if max_errors > 0:
+        return detect_transposons_approx(sequence, patterns, max_errors, error_model, both_strands)
+    automaton = TransposonAutomaton(patterns, both_strands)
+    hits = sorted(automaton.scan(sequence), key=lambda hit: (hit[1], hit[0], hit[3] == "-"))
+    if both_strands:
+        return [(automaton.patterns[idx], start, end, strand) for idx, start, end, strand in hits]
+    return [(automaton.patterns[idx], start, end) for idx, start, end, _ in hits]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+import os
+import random
+import tempfile
+import time
+
+from L8_Project import (NUCS, TRANSPOSONS, TransposonAutomaton, build_artificial_sequence, detect_transposons,
+                        find_all_occurrences, generate_synthetic_genome, reverse_complement, write_synthetic_fasta)
+
+BENCH_SEQ_LEN = 1_000_000
+PATTERN_COUNTS = (10, 1000, 10000)
+COPIES_PER_RUN = 200
+APPROX_SEQ_LEN = 100_000
+MUTATION_RATES = (0.0, 0.05, 0.1, 0.2)
+GENERATOR_LENGTHS = (10_000_000, 100_000_000)
+GENERATOR_INSERTIONS_PER_MBP = 100
+MARKOV_MATRIX = [[0.4, 0.2, 0.2, 0.2],
+                 [0.2, 0.4, 0.2, 0.2],
+                 [0.2, 0.2, 0.4, 0.2],
+                 [0.2, 0.2, 0.2, 0.4]]
+
+
+def random_library(n_patterns, min_len=12, max_len=40, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(NUCS) for _ in range(rng.randint(min_len, max_len))) for _ in range(n_patterns)]
+
+
+def plant_copies(background, patterns, n_copies, seed=0):
+    rng = random.Random(seed)
+    pieces = []
+    prev = 0
+    for pos in sorted(rng.sample(range(len(background)), n_copies)):
+        te = rng.choice(patterns)
+        if rng.random() < 0.5:
+            te = reverse_complement(te)
+        pieces.append(background[prev:pos])
+        pieces.append(te)
+        prev = pos
+    pieces.append(background[prev:])
+    return "".join(pieces)
+
+
+def naive_detect(sequence, patterns, both_strands=True):
+    hits = 0
+    for te in patterns:
+        hits += len(find_all_occurrences(sequence, te))
+        rc = reverse_complement(te)
+        if both_strands and rc != te:
+            hits += len(find_all_occurrences(sequence, rc))
+    return hits
+
+
+def benchmark_exact(pattern_counts=PATTERN_COUNTS, seq_len=BENCH_SEQ_LEN):
+    rng = random.Random(1)
+    background = "".join(rng.choice(NUCS) for _ in range(seq_len))
+    print(f"Exact transposon detection, both strands, {seq_len} bp")
+    print(f"{'patterns':>9}  {'build (s)':>10}  {'scan (s)':>9}  {'per-pattern (s)':>16}  {'hits':>6}")
+    for n_patterns in pattern_counts:
+        patterns = random_library(n_patterns, seed=n_patterns)
+        sequence = plant_copies(background, patterns, COPIES_PER_RUN, seed=n_patterns)
+
+        t0 = time.perf_counter()
+        automaton = TransposonAutomaton(patterns, both_strands=True)
+        t1 = time.perf_counter()
+        hits = sum(1 for _ in automaton.scan(sequence))
+        t2 = time.perf_counter()
+        naive_hits = naive_detect(sequence, patterns)
+        t3 = time.perf_counter()
+
+        if hits != naive_hits:
+            raise RuntimeError(f"Automaton found {hits} hits, per-pattern search found {naive_hits}.")
+        print(f"{n_patterns:>9}  {t1 - t0:>10.3f}  {t2 - t1:>9.3f}  {t3 - t2:>16.3f}  {hits:>6}")
+    print()
+
+
+def recall(truth, hits, tolerance):
+    found = 0
+    for start, _, te in truth:
+        if any(hit[0] == te and abs(hit[1] - start) <= tolerance for hit in hits):
+            found += 1
+    return found / len(truth)
+
+
+def benchmark_approximate(mutation_rates=MUTATION_RATES, seq_len=APPROX_SEQ_LEN, max_errors=2):
+    print(f"Approximate transposon detection, {len(TRANSPOSONS)} patterns, both strands, {seq_len} bp, k={max_errors}")
+    print(f"{'model':>8}  {'mut. rate':>9}  {'recall':>6}  {'hits':>6}  {'time (s)':>8}  {'Mbp/s':>6}")
+    for error_model in ("mismatch", "edit"):
+        for rate in mutation_rates:
+            sequence, truth = build_artificial_sequence(seq_len, seq_len, n_tes=len(TRANSPOSONS), mutation_rate=rate)
+            t0 = time.perf_counter()
+            hits = detect_transposons(sequence, TRANSPOSONS, both_strands=True,
+                                      max_errors=max_errors, error_model=error_model)
+            elapsed = time.perf_counter() - t0
+            # every pattern is searched on both strands
+            throughput = 2 * len(TRANSPOSONS) * len(sequence) / elapsed / 1e6
+            print(f"{error_model:>8}  {rate:>9.2f}  {recall(truth, hits, max_errors):>6.2f}  {len(hits):>6}  "
+                  f"{elapsed:>8.3f}  {throughput:>6.2f}")
+    print()
+
+
+def benchmark_generator(lengths=GENERATOR_LENGTHS):
+    print(f"Synthetic genome generation, {GENERATOR_INSERTIONS_PER_MBP} insertions/Mbp, 5% divergence")
+    print(f"{'length':>11}  {'background':>10}  {'in memory (s)':>13}  {'to FASTA (s)':>12}  {'Mbp/s':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.fa")
+        for length in lengths:
+            for label, matrix in (("i.i.d.", None), ("markov", MARKOV_MATRIX)):
+                options = dict(n_insertions=GENERATOR_INSERTIONS_PER_MBP * length // 1_000_000, divergence=0.05,
+                               transition_matrix=matrix, seed=length)
+                t0 = time.perf_counter()
+                generate_synthetic_genome(length, **options)
+                t1 = time.perf_counter()
+                write_synthetic_fasta(path, length, **options)
+                t2 = time.perf_counter()
+                print(f"{length:>11}  {label:>10}  {t1 - t0:>13.3f}  {t2 - t1:>12.3f}  {length / (t2 - t1) / 1e6:>6.1f}")
+    print()
+
+
+if __name__ == "__main__":
+    benchmark_exact()
+    benchmark_approximate()
+    benchmark_generator()
@@ -1,23 +1,15 @@
 #!/usr/bin/env python3
+import os
+import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from collections import OrderedDict
 
-def read_first_fasta_sequence(path: str) -> str:
-    seq_lines = []
-    in_record = False
-    with open(path, "r", encoding="utf-8") as f:
-        for raw in f:
-            line = raw.rstrip("\n")
-            if line.startswith(">"):
-                if in_record and seq_lines:
-                    break
-                in_record = True
-                continue
-            if in_record or (not in_record and line and not line.startswith(">")):
-                seq_lines.append(line)
-                in_record = True
-    return "".join(seq_lines).upper().replace(" ", "").replace("\t", "")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))  # shared Labs/common modules
+from fasta_index import load_fasta
+from tk_worker import TkWorker
+
+COUNT_BLOCK = 1_000_000  # bases counted between progress updates
 
 def first_appearance_counts(seq: str) -> OrderedDict:
     counts = OrderedDict()
@@ -27,11 +19,24 @@ def first_appearance_counts(seq: str) -> OrderedDict:
         counts[ch] += 1
     return counts
 
+def load_record_counts(job, record):
+    """Worker job: reads and counts one record block by block from the index, showing running totals."""
+    counts = OrderedDict()
+    for start in range(0, len(record), COUNT_BLOCK):
+        job.check()
+        block = record[start:start + COUNT_BLOCK].upper()
+        for ch, cnt in first_appearance_counts(block).items():
+            counts[ch] = counts.get(ch, 0) + cnt
+        done = min(start + COUNT_BLOCK, len(record))
+        job.progress(f"Counted {done:,} of {len(record):,} symbols…")
+        job.partial((OrderedDict(counts), done))
+    return counts
+
 class FastaApp(tk.Tk):
     def __init__(self):
         super().__init__()
-        self.title("FASTA Alphabet & Percentages (first sequence)")
-        self.geometry("560x380")
+        self.title("FASTA Alphabet & Percentages (selected record)")
+        self.geometry("560x450")
         self.resizable(False, False)
 
         self.path_var = tk.StringVar(value="No file selected")
@@ -41,8 +46,17 @@ class FastaApp(tk.Tk):
         top = ttk.Frame(self, padding=10)
         top.pack(fill="x")
         ttk.Button(top, text="Open FASTA…", command=self.open_fasta).pack(side="left")
+        ttk.Button(top, text="Cancel", command=self.cancel).pack(side="left", padx=(5, 0))
         ttk.Label(top, textvariable=self.path_var, foreground="#555").pack(side="left", padx=10)
 
+        pick = ttk.Frame(self, padding=(10, 0, 10, 5))
+        pick.pack(fill="x")
+        ttk.Label(pick, text="Record:").pack(side="left")
+        self.record_var = tk.StringVar()
+        self.record_box = ttk.Combobox(pick, textvariable=self.record_var, state="readonly", width=50)
+        self.record_box.pack(side="left", padx=5)
+        self.record_box.bind("<<ComboboxSelected>>", lambda event: self.load_record())
+
         info = ttk.Frame(self, padding=(10, 0, 10, 0))
         info.pack(fill="x", pady=5)
         ttk.Label(info, textvariable=self.alphabet_var, font=("TkDefaultFont", 10, "bold")).pack(side="left")
@@ -72,7 +86,11 @@ class FastaApp(tk.Tk):
             text="Tip: The alphabet is shown in the order of first appearance in the sequence."
         ).pack(side="left")
 
-        self.current_seq = ""
+        self.status_var = tk.StringVar(value="Open a FASTA file to begin.")
+        ttk.Label(self, textvariable=self.status_var, anchor="w", padding=(10, 0, 10, 8)).pack(fill="x")
+
+        self.index = None
+        self.worker = TkWorker(self, self.status_var)
 
     def open_fasta(self):
         path = filedialog.askopenfilename(
@@ -81,26 +99,41 @@ class FastaApp(tk.Tk):
         )
         if not path:
             return
-        try:
-            seq = read_first_fasta_sequence(path)
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not read file:\n{e}")
-            return
 
-        if not seq:
+        self.path_var.set(path)
+        self.status_var.set("Indexing FASTA…")
+        self.worker.submit(lambda job: load_fasta(path), on_done=self.set_index,
+                           on_error=lambda e: messagebox.showerror("Error", f"Could not read file:\n{e}"))
+
+    def cancel(self):
+        self.worker.cancel()
+
+    def set_index(self, index):
+        if not len(index):
+            self.status_var.set("No sequence data found.")
             messagebox.showwarning("No sequence", "No sequence data found in this file.")
             return
 
-        self.current_seq = seq
-        self.path_var.set(path)
-        self.populate_results(seq)
+        self.index = index
+        self.record_box["values"] = index.names
+        self.record_var.set(index.names[0])
+        self.load_record()
+
+    def load_record(self):
+        record = self.index[self.record_var.get()]
+        self.status_var.set(f"Reading {record.name}…")
+        self.worker.submit(load_record_counts, record, on_done=lambda counts: self.show_record(record, counts),
+                           on_partial=lambda result: self.populate_results(*result),
+                           on_error=lambda e: messagebox.showerror("Error", f"Could not read record:\n{e}"))
+
+    def show_record(self, record, counts):
+        self.populate_results(counts, len(record))
+        self.status_var.set(f"{record.name}: {len(record):,} symbols ({len(self.index)} records in file).")
 
-    def populate_results(self, seq: str):
+    def populate_results(self, counts, total):
         for row in self.tree.get_children():
             self.tree.delete(row)
 
-        counts = first_appearance_counts(seq)
-        total = len(seq)
         alphabet = "".join(counts.keys())
         self.alphabet_var.set(f"Alphabet: {alphabet}")
         self.len_var.set(f"Length: {total}")
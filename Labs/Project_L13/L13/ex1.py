@@ -1,47 +1,38 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
 import numpy as np
-import json
+import os
+import sys
 import random
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))  # shared Labs/common modules
+from markov import MarkovModel, MarkovSampler, MarkovTrainer, StatePredictor
+from tk_worker import TkWorker
 
-class StatePredictor:
-    def __init__(self, transition_matrix, initial_vector):
-        self.matrix = np.array(transition_matrix)
-        self.current_state = np.array(initial_vector)
+DNA_MODEL_FILE = "dna_matrix.markov"
 
-    def predict(self, steps=5):
-        predictions = []
-        for _ in range(steps):
-            next_state = np.dot(self.matrix, self.current_state)
-            predictions.append(next_state)
-            self.current_state = next_state
-        return predictions
 
 class SequenceSynthesizer:
-    def __init__(self, transition_matrix, states):
+    def __init__(self, transition_matrix, states, seed=None):
         self.matrix = np.array(transition_matrix)
         self.states = states
         self.n_states = len(states)
+        self.sampler = MarkovSampler(self.matrix, states, seed=seed)
+
+    def generate(self, length=20, n_sequences=1):
+        sequences = [self.sampler.decode(row) for row in self.sampler.generate(n_sequences, length)]
+        return sequences[0] if n_sequences == 1 else sequences
 
-    def generate(self, length=20):
-        current_idx = random.randint(0, self.n_states - 1)
-        sequence = [self.states[current_idx]]
-        
-        for _ in range(length - 1):
-            probs = self.matrix[:, current_idx]
-            
-            if np.sum(probs) == 0:
-                break
-                
-            probs = probs / np.sum(probs)
-            
-            next_idx = np.random.choice(range(self.n_states), p=probs)
-            
-            sequence.append(self.states[next_idx])
-            current_idx = next_idx
-            
-        return "".join(sequence)
+
+def train_job(job, paths):
+    """Worker job: trains on one file at a time, showing the matrix after each."""
+    trainer = MarkovTrainer(order=1)
+    for i, path in enumerate(paths, 1):
+        job.check()
+        job.progress(f"Training on {os.path.basename(path)} ({i}/{len(paths)})...")
+        trainer.train_fasta(path)
+        job.partial(trainer.model())
+    return trainer.model()
 
 
 class DnaTool:
@@ -59,10 +50,12 @@ class DnaTool:
         self.txt_seq = tk.Text(lbl_frame, height=2, width=70)
         self.txt_seq.pack(pady=5)
 
-        mat_frame = tk.LabelFrame(root, text="2. Transition Matrix (JSON)", padx=10, pady=10)
+        mat_frame = tk.LabelFrame(root, text="2. Transition Matrix", padx=10, pady=10)
         mat_frame.pack(fill="x", padx=10, pady=5)
         
         tk.Button(mat_frame, text="Compute & Save Matrix", command=self.compute_matrix).pack(anchor="w")
+        tk.Button(mat_frame, text="Train Matrix from FASTA...", command=self.train_from_fasta).pack(anchor="w")
+        tk.Button(mat_frame, text="Cancel", command=lambda: self.worker.cancel()).pack(anchor="w")
         self.txt_matrix = tk.Text(mat_frame, height=5, width=70)
         self.txt_matrix.pack(pady=5)
 
@@ -80,6 +73,10 @@ class DnaTool:
         self.txt_syn = tk.Text(syn_frame, height=3, width=70, fg="blue")
         self.txt_syn.pack(pady=5)
 
+        self.status_var = tk.StringVar(value="Ready")
+        tk.Label(root, textvariable=self.status_var, anchor="w").pack(fill="x", padx=10, pady=(0, 5))
+        self.worker = TkWorker(root, self.status_var)
+
     def generate_random_dna(self):
         seq = "".join(random.choices("ACGT", k=50))
         self.txt_seq.delete(1.0, tk.END)
@@ -89,29 +86,27 @@ class DnaTool:
         seq = self.txt_seq.get(1.0, tk.END).strip()
         if not seq: return
         
-        state_map = {char: i for i, char in enumerate(self.states)}
-        counts = np.zeros((4, 4))
-        
-        for i in range(len(seq) - 1):
-            curr, next_ = seq[i], seq[i+1]
-            c, r = state_map[curr], state_map[next_]
-            counts[r][c] += 1
-            
-        self.matrix = np.zeros((4, 4))
-        for col in range(4):
-            total = np.sum(counts[:, col])
-            if total > 0:
-                self.matrix[:, col] = counts[:, col] / total
-            else:
-                self.matrix[col, col] = 1.0 
-
-        with open("dna_matrix.json", "w") as f:
-            json.dump(self.matrix.tolist(), f)
-        
+        self.status_var.set("Computing matrix...")
+        self.worker.submit(lambda job: MarkovModel.from_sequence(seq, order=1), on_done=self.save_model)
+
+    def train_from_fasta(self):
+        paths = filedialog.askopenfilenames(filetypes=[("FASTA", "*.fasta *.fa *.fna"), ("All files", "*")])
+        if not paths: return
+
+        self.worker.submit(train_job, paths, on_done=self.save_model, on_partial=self.show_matrix)
+
+    def show_matrix(self, model):
         self.txt_matrix.delete(1.0, tk.END)
-        for row in self.matrix:
+        for row in model.matrix:
             self.txt_matrix.insert(tk.END, str([round(x, 2) for x in row]) + "\n")
-        messagebox.showinfo("Success", "Matrix computed and saved to dna_matrix.json")
+
+    def save_model(self, model):
+        self.matrix = model.matrix
+        model.save(DNA_MODEL_FILE)
+        
+        self.show_matrix(model)
+        self.status_var.set(f"Matrix saved to {DNA_MODEL_FILE}")
+        messagebox.showinfo("Success", f"Matrix computed and saved to {DNA_MODEL_FILE}")
 
     def run_prediction(self):
         if self.matrix is None: return
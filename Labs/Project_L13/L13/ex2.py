@@ -1,44 +1,54 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
 import numpy as np
-import json
-import random
-import re
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))  # shared Labs/common modules
+from markov import CscMatrix, MarkovSampler, StatePredictor, WordMarkovModel, WordTrainer
+from tk_worker import TkWorker
+
+TEXT_MODEL_FILE = "text_matrix.markov"
+DISPLAY_WORDS = 30           # top-left corner of the matrix (and first symbols) shown in the GUI
+
+def symbol_label(i):
+    # A..Z, then AA, AB, ... so every word keeps a distinct symbol
+    label = ""
+    i += 1
+    while i:
+        i, rem = divmod(i - 1, 26)
+        label = chr(65 + rem) + label
+    return label
+
+def save_model(model):
+    """Worker side: saves the model with its word -> symbol mapping; returns (model, mapping)."""
+    mapping = {w: symbol_label(i) for i, w in enumerate(model.words)}
+    model.save(TEXT_MODEL_FILE, mapping=mapping)
+    return model, mapping
+
+def train_corpus_job(job, paths):
+    """Worker job: streams the corpus files through one WordTrainer, then builds and saves the model."""
+    trainer = WordTrainer()
+    for i, path in enumerate(paths, 1):
+        job.check()
+        job.progress(f"Training on {os.path.basename(path)} ({i}/{len(paths)})...")
+        trainer.add_file(path)
+    job.check()
+    job.progress("Building the transition matrix...")
+    return save_model(trainer.model())
 
 # --- Core Logic (Reused) ---
 
-class StatePredictor:
-    def __init__(self, transition_matrix, initial_vector):
-        self.matrix = np.array(transition_matrix)
-        self.current_state = np.array(initial_vector)
-
-    def predict(self, steps=5):
-        predictions = []
-        for _ in range(steps):
-            next_state = np.dot(self.matrix, self.current_state)
-            predictions.append(next_state)
-            self.current_state = next_state
-        return predictions
-
 class TextSynthesizer:
-    def __init__(self, transition_matrix, word_list):
-        self.matrix = np.array(transition_matrix)
+    def __init__(self, transition_matrix, word_list, seed=None):
+        self.matrix = transition_matrix if isinstance(transition_matrix, CscMatrix) else np.array(transition_matrix)
         self.words = word_list # List of words indexed 0..N
         self.n = len(word_list)
+        self.sampler = MarkovSampler(self.matrix, word_list, seed=seed)
 
-    def generate(self, length=15):
-        curr_idx = random.randint(0, self.n - 1)
-        output = [self.words[curr_idx]]
-        
-        for _ in range(length - 1):
-            probs = self.matrix[:, curr_idx]
-            if np.sum(probs) == 0: break
-            probs = probs / np.sum(probs)
-            
-            curr_idx = np.random.choice(range(self.n), p=probs)
-            output.append(self.words[curr_idx])
-            
-        return " ".join(output)
+    def generate(self, length=15, n_sentences=1):
+        sentences = [self.sampler.decode(row, " ") for row in self.sampler.generate(n_sentences, length)]
+        return sentences[0] if n_sentences == 1 else sentences
 
 
 class TextTool:
@@ -54,13 +64,15 @@ class TextTool:
         lbl_frame.pack(fill="x", padx=10, pady=5)
         
         tk.Button(lbl_frame, text="Load Default Text", command=self.load_text).pack(anchor="w")
+        tk.Button(lbl_frame, text="Train on Corpus File...", command=self.load_corpus).pack(anchor="w")
+        tk.Button(lbl_frame, text="Cancel", command=lambda: self.worker.cancel()).pack(anchor="w")
         self.txt_input = tk.Text(lbl_frame, height=4, width=80)
         self.txt_input.pack(pady=5)
 
         mat_frame = tk.LabelFrame(root, text="2. Transition Matrix & Symbols", padx=10, pady=10)
         mat_frame.pack(fill="x", padx=10, pady=5)
         
-        tk.Button(mat_frame, text="Compute & Save JSON", command=self.compute).pack(anchor="w")
+        tk.Button(mat_frame, text="Compute & Save Model", command=self.compute).pack(anchor="w")
         self.txt_legend = tk.Text(mat_frame, height=3, width=80, bg="#f0f0f0")
         self.txt_legend.pack(pady=2)
         self.txt_matrix = tk.Text(mat_frame, height=5, width=80)
@@ -80,6 +92,10 @@ class TextTool:
         self.txt_syn = tk.Text(syn_frame, height=4, width=80, fg="blue", font=("Arial", 10, "bold"))
         self.txt_syn.pack(pady=5)
 
+        self.status_var = tk.StringVar(value="Ready")
+        tk.Label(root, textvariable=self.status_var, anchor="w").pack(fill="x", padx=10, pady=(0, 5))
+        self.worker = TkWorker(root, self.status_var)
+
     def load_text(self):
         text = ("The cat sat on the mat. The dog sat on the log. "
                 "The cat saw the dog. The dog saw the cat. "
@@ -92,36 +108,35 @@ class TextTool:
     def compute(self):
         raw = self.txt_input.get(1.0, tk.END).strip()
         if not raw: return
-        
-        clean = re.sub(r'[^\w\s]', '', raw).lower()
-        words = clean.split()
-        self.unique_words = sorted(list(set(words)))
+        self.status_var.set("Computing matrix...")
+        self.worker.submit(lambda job: save_model(WordMarkovModel.from_text(raw)), on_done=self.use_model)
+
+    def load_corpus(self):
+        paths = filedialog.askopenfilenames(filetypes=[("Text", "*.txt"), ("All files", "*")])
+        if not paths: return
+        self.worker.submit(train_corpus_job, paths, on_done=self.use_model)
+
+    def use_model(self, result):
+        model, self.mapping = result
+        self.unique_words = model.words
+        self.matrix = model.matrix
         n = len(self.unique_words)
-        
-        self.mapping = {w: chr(65+i) for i, w in enumerate(self.unique_words)}
-        
-        counts = np.zeros((n, n))
-        for i in range(len(words)-1):
-            curr_i = self.unique_words.index(words[i])
-            next_i = self.unique_words.index(words[i+1])
-            counts[next_i][curr_i] += 1 
-            
-        self.matrix = np.zeros((n, n))
-        for c in range(n):
-            s = np.sum(counts[:, c])
-            if s > 0: self.matrix[:, c] = counts[:, c] / s
-            else: self.matrix[c, c] = 1.0
-
-        data = {"mapping": self.mapping, "matrix": self.matrix.tolist()}
-        with open("text_matrix.json", "w") as f:
-            json.dump(data, f)
+        shown = min(n, DISPLAY_WORDS)
 
+        legend = {w: self.mapping[w] for w in self.unique_words[:shown]}
+        more = f" ... ({n} words)" if n > shown else ""
         self.txt_legend.delete(1.0, tk.END)
-        self.txt_legend.insert(tk.END, f"Mapping: {self.mapping}")
+        self.txt_legend.insert(tk.END, f"Mapping: {legend}{more}")
         
+        block = np.zeros((shown, shown))
+        for c in range(shown):
+            rows, values = self.matrix.column(c)
+            keep = rows < shown
+            block[rows[keep], c] = values[keep]
         self.txt_matrix.delete(1.0, tk.END)
-        for row in self.matrix:
+        for row in block:
             self.txt_matrix.insert(tk.END, " ".join([f"{x:.1f}" for x in row]) + "\n")
+        self.status_var.set(f"{n} words | model saved to {TEXT_MODEL_FILE}")
 
     def run_prediction(self):
         if self.matrix is None: return
@@ -1,46 +1,37 @@
-import json
+import os
 import numpy as np
-import random
 
-def load_dna_matrix(filename="dna_matrix.json"):
-    with open(filename, 'r') as f:
-        matrix = json.load(f)
-    return np.array(matrix)
+from markov import MarkovSampler, import_json, load_matrix
 
-def synthesize_dna(matrix, length=50, start_state_index=None):
+DNA_MODEL_FILE = "dna_matrix.markov"
+LEGACY_JSON_FILE = "dna_matrix.json"
+
+# set to True to also write a background set for the log-odds scorer
+WRITE_NULL_MODEL = False
+NULL_MODEL_FASTA = "synthetic_dna.fasta"
+NULL_MODEL_SEQUENCES = 1000
+NULL_MODEL_LENGTH = 1000
+
+def load_dna_matrix(filename=DNA_MODEL_FILE):
+    # Older runs of Exercise 1 only left dna_matrix.json behind
+    if not os.path.exists(filename) and os.path.exists(LEGACY_JSON_FILE):
+        filename = LEGACY_JSON_FILE
+    if filename.endswith(".json"):
+        return import_json(filename)[0]
+    return np.array(load_matrix(filename)[0])
+
+def synthesize_dna(matrix, length=50, start_state_index=None, seed=None):
     states = ['A', 'C', 'G', 'T']
-    n_states = len(states)
     
-    # If no start state is given, pick a random one
-    if start_state_index is None:
-        current_idx = random.randint(0, n_states - 1)
-    else:
-        current_idx = start_state_index
-        
-    sequence = [states[current_idx]]
+    # Column j holds the probabilities of going from state j TO every other state;
+    # the sampler normalizes all columns once up front instead of once per base.
+    if np.any(np.sum(matrix, axis=0) == 0):
+        print("Warning: Absorbing state reached (no outgoing transitions); it repeats itself.")
+    sampler = MarkovSampler(matrix, states, seed=seed)
+    sequence = sampler.generate(1, length, start=start_state_index)[0]
     
-    print(f"Start State: {states[current_idx]}")
-
-    for _ in range(length - 1):
-        # Extract the probability column for the current state
-        # (Column 'current_idx' contains probabilities of going TO other states)
-        probs = matrix[:, current_idx]
-        
-        # Check if the column sums to ~1 (valid stochastic matrix)
-        if np.sum(probs) == 0:
-            print("Warning: Absorbing state reached (no outgoing transitions).")
-            break
-            
-        # Normalize to ensure sum is exactly 1.0 for np.random.choice
-        probs = probs / np.sum(probs)
-        
-        # Sample the next state based on these probabilities
-        next_idx = np.random.choice(range(n_states), p=probs)
-        
-        sequence.append(states[next_idx])
-        current_idx = next_idx
-        
-    return "".join(sequence)
+    print(f"Start State: {states[sequence[0]]}")
+    return sampler.decode(sequence)
 
 if __name__ == "__main__":
     try:
@@ -50,6 +41,10 @@ if __name__ == "__main__":
         new_dna = synthesize_dna(matrix, length=50)
         print("\nGenerated Sequence:")
         print(new_dna)
+
+        if WRITE_NULL_MODEL:
+            MarkovSampler(matrix).write_fasta(NULL_MODEL_FASTA, NULL_MODEL_SEQUENCES, NULL_MODEL_LENGTH)
+            print(f"\n{NULL_MODEL_SEQUENCES} background sequences of {NULL_MODEL_LENGTH} bp written to {NULL_MODEL_FASTA}")
         
     except FileNotFoundError:
-        print("Error: 'dna_matrix.json' not found. Please run the Exercise 1 GUI first.")
\ No newline at end of file
+        print(f"Error: '{DNA_MODEL_FILE}' not found. Please run the Exercise 1 GUI first.")
\ No newline at end of file
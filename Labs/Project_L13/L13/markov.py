@@ -0,0 +1,762 @@
+#Shared Markov chain machinery for the L13 exercises: training from FASTA files on top of numpy.
+#Matrices follow the orientation of StatePredictor: column = current state (context), row = next state.
+
+
+import hashlib
+import json
+import re
+import struct
+from bisect import bisect_right
+
+import numpy as np
+
+STATES = ['A', 'C', 'G', 'T']
+MAX_ORDER = 10
+TRAIN_CHUNK_BYTES = 8_000_000
+SCALAR_CHAINS = 16  # below this many chains a plain loop over pre-drawn uniforms beats per-step numpy calls
+SAMPLE_BATCH_BASES = 4_000_000  # bases generated per batch when streaming to FASTA
+FASTA_LINE_WIDTH = 60
+MIXING_EPSILON = 0.25   # total-variation distance that counts as "mixed"
+MAX_MIXING_STEPS = 10 ** 9
+STATIONARY_TOL = 1e-12
+SPARSE_MIXING_STARTS = 32  # start states sampled when estimating mixing on a sparse chain
+SPARSE_DOT_ELEMENTS = 8_000_000  # largest (nnz x batch) temporary built by CscMatrix.dot
+WORD_CHUNK_TOKENS = 1_000_000  # tokens per vectorized counting pass when training on text files
+PUNCTUATION = re.compile(r'[^\w\s]')
+SCORE_WINDOW = 200
+SCORE_THRESHOLD = 0.0
+PSEUDOCOUNT = 1.0
+SEGMENT_DTYPE = np.dtype([("start", np.int64), ("end", np.int64), ("score", np.float32)])
+
+MODEL_MAGIC = b"L13MARKV"
+MODEL_VERSION = 1
+MODEL_ALIGN = 64  # byte alignment of the header end and of every array
+JSON_DENSE_MAX_STATES = 500  # larger sparse models are exported to JSON as CSC arrays
+
+BASE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate("ACGT"):
+    BASE_CODES[ord(_base)] = _code
+    BASE_CODES[ord(_base.lower())] = _code
+
+
+def encode_sequence(seq):
+    """A/C/G/T -> 0..3 (either case); anything else (N, gaps, ...) -> 4."""
+    if isinstance(seq, str):
+        seq = seq.encode("ascii", "replace")
+    return BASE_CODES[np.frombuffer(seq, dtype=np.uint8)]
+
+
+def rolling_codes(codes, width):
+    """
+    Code of every width-long window (context * 4 + next base for width = order + 1;
+    4**(MAX_ORDER + 1) fits in 32 bits) and a mask of windows free of non-ACGT
+    bases, or None when the whole input is clean.
+    """
+    n = len(codes) - width + 1
+    is_bad = codes > 3
+    clean = np.where(is_bad, 0, codes).astype(np.uint32)
+    window = clean[:n].copy()
+    for j in range(1, width):
+        window <<= 2
+        window |= clean[j:j + n]
+    if not is_bad.any():
+        return window, None
+    bad = np.concatenate(([0], np.cumsum(is_bad, dtype=np.int32)))
+    return window, bad[width:] == bad[:n]
+
+
+def context_labels(order):
+    """Context names in column order, e.g. order 2 -> ['AA', 'AC', ..., 'TT']."""
+    labels = [""]
+    for _ in range(order):
+        labels = [label + base for label in labels for base in STATES]
+    return labels
+
+
+class MarkovModel:
+    def __init__(self, counts, order=1):
+        self.order = order
+        self.counts = np.asarray(counts)  # shape (4, 4**order): [next base, context]
+        self.states = STATES
+
+    @property
+    def matrix(self):
+        """
+        Column-stochastic transition matrix. A context never seen in training
+        repeats its last base, which for order 1 is the self-loop DnaTool used.
+        """
+        totals = self.counts.sum(axis=0)
+        matrix = np.zeros(self.counts.shape)
+        seen = totals > 0
+        matrix[:, seen] = self.counts[:, seen] / totals[seen]
+        unseen = np.flatnonzero(~seen)
+        matrix[unseen & 3, unseen] = 1.0
+        return matrix
+
+    @classmethod
+    def from_sequence(cls, seq, order=1):
+        trainer = MarkovTrainer(order)
+        trainer.update(encode_sequence(seq))
+        return trainer.model()
+
+    @classmethod
+    def from_fasta(cls, *paths, order=1):
+        return MarkovTrainer(order).train_fasta(*paths)
+
+    def save(self, path):
+        write_model_file(path, {"matrix": self.matrix, "counts": self.counts}, kind="dense", states=self.states,
+                         order=self.order, shape=list(self.counts.shape), metadata={})
+
+    @classmethod
+    def load(cls, path, verify=False):
+        header, arrays = read_model_file(path, verify)
+        return cls(arrays["counts"], header["order"])
+
+
+class MarkovTrainer:
+    """
+    Streams encoded bases and counts order-k transitions with one np.bincount per
+    chunk over rolling (k+1)-mer codes. Windows touching a non-ACGT base are
+    skipped, and end_record() stops windows from spanning two FASTA records.
+    """
+
+    def __init__(self, order=1):
+        if not 1 <= order <= MAX_ORDER:
+            raise ValueError(f"Order must be between 1 and {MAX_ORDER}.")
+        self.order = order
+        self.flat_counts = np.zeros(4 ** (order + 1), dtype=np.int64)
+        self._tail = np.empty(0, dtype=np.uint8)
+
+    def update(self, codes):
+        codes = np.concatenate((self._tail, codes))
+        width = self.order + 1
+        self._tail = codes[max(len(codes) - self.order, 0):].copy()
+        if len(codes) < width:
+            return
+        window, valid = rolling_codes(codes, width)
+        if valid is not None:
+            window = window[valid]
+        self.flat_counts += np.bincount(window, minlength=len(self.flat_counts))
+
+    def end_record(self):
+        self._tail = np.empty(0, dtype=np.uint8)
+
+    def train_fasta(self, *paths, chunk_bytes=TRAIN_CHUNK_BYTES):
+        for path in paths:
+            with open(path, "rb") as f:
+                while True:
+                    block = f.read(chunk_bytes)
+                    if not block:
+                        break
+                    self._feed_block(block + f.readline())  # end every block on a line boundary
+            self.end_record()
+        return self.model()
+
+    def _feed_block(self, block):
+        pos = 0
+        while pos < len(block):
+            if block.startswith(b">", pos):
+                self.end_record()
+                eol = block.find(b"\n", pos)
+                pos = len(block) if eol < 0 else eol + 1
+                continue
+            header = block.find(b"\n>", pos)
+            end = len(block) if header < 0 else header + 1
+            raw = np.frombuffer(block, dtype=np.uint8, count=end - pos, offset=pos)
+            self.update(BASE_CODES[raw[raw > 32]])  # drop line breaks and other whitespace
+            pos = end
+
+    def model(self):
+        counts = self.flat_counts.reshape(4 ** self.order, 4).T.copy()
+        return MarkovModel(counts, self.order)
+
+
+class MarkovSampler:
+    """
+    Vectorized sampling from a column-stochastic matrix of shape
+    (n_states, n_contexts), where n_contexts = n_states ** order.
+
+    All columns are normalized once and their cumulative sums are laid out in one
+    increasing array (column c occupies (c, c + 1]), so drawing the next state of
+    every chain is a single np.searchsorted of context + uniform. Chains advance
+    together, one vectorized step for the whole batch; a handful of long chains
+    instead run a bisect loop over uniforms drawn in bulk. A column without any
+    probability mass repeats the last state of its context.
+
+    A CscMatrix is sampled the same way over its stored entries only, so large
+    sparse vocabularies never become dense; every column needs an entry.
+    """
+
+    def __init__(self, matrix, states=STATES, order=1, seed=None):
+        self.states = list(states)
+        self.order = order
+        self.n_states, self.n_contexts = matrix.shape
+        if self.n_contexts != self.n_states ** order:
+            raise ValueError(f"A matrix with {self.n_states} rows needs {self.n_states ** order} columns for order {order}.")
+        self.rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        if isinstance(matrix, CscMatrix):
+            self._init_sparse(matrix)
+            return
+
+        self.targets = None
+        matrix = np.asarray(matrix, dtype=np.float64)
+        totals = matrix.sum(axis=0)
+        empty = totals <= 0
+        probs = matrix / np.where(empty, 1.0, totals)
+        probs[:, empty] = 0.0
+        probs[np.flatnonzero(empty) % self.n_states, empty] = 1.0
+        cdf = np.cumsum(probs.T, axis=1)
+        cdf[:, -1] = 1.0
+        self.flat_cdf = (cdf + np.arange(self.n_contexts)[:, None]).ravel()
+
+    def _init_sparse(self, matrix):
+        sizes = np.diff(matrix.indptr)
+        cols = np.repeat(np.arange(self.n_contexts), sizes)
+        totals = np.bincount(cols, weights=matrix.data, minlength=self.n_contexts)
+        if (totals <= 0).any():
+            raise ValueError("Every column of a sparse transition matrix needs a positive entry.")
+        cum = np.cumsum(matrix.data / totals[cols])
+        cdf = cum - np.repeat(np.concatenate(([0.0], cum))[matrix.indptr[:-1]], sizes)
+        cdf[matrix.indptr[1:] - 1] = 1.0
+        self.flat_cdf = cdf + cols
+        self.targets = np.asarray(matrix.indices)
+
+    def step(self, contexts):
+        """Next state for every chain in the `contexts` array."""
+        u = self.rng.random(len(contexts))
+        pos = np.searchsorted(self.flat_cdf, contexts + u, side="right")
+        return pos - contexts * self.n_states if self.targets is None else self.targets[pos]
+
+    def generate(self, n_sequences=1, length=50, start=None):
+        """
+        (n_sequences, length) array of state indices. Each chain starts from the
+        context `start` (index into the columns) or from a uniformly drawn one,
+        whose `order` states open the sequence.
+        """
+        out = np.empty((n_sequences, length), dtype=np.int32 if self.n_states > 255 else np.uint8)
+        if start is None:
+            contexts = self.rng.integers(self.n_contexts, size=n_sequences)
+        else:
+            contexts = np.full(n_sequences, start, dtype=np.int64)
+        for t in range(min(self.order, length)):
+            out[:, t] = contexts // self.n_states ** (self.order - 1 - t) % self.n_states
+        if n_sequences < SCALAR_CHAINS:
+            for row, context in zip(out, contexts.tolist()):
+                row[self.order:] = self._walk(context, length - self.order)
+            return out
+        for t in range(self.order, length):
+            nxt = self.step(contexts)
+            out[:, t] = nxt
+            contexts = (contexts * self.n_states + nxt) % self.n_contexts
+        return out
+
+    def _walk(self, context, steps):
+        flat_cdf = self.flat_cdf.tolist()
+        targets = None if self.targets is None else self.targets.tolist()
+        n_states, n_contexts = self.n_states, self.n_contexts
+        states = []
+        for u in self.rng.random(max(steps, 0)).tolist():
+            pos = bisect_right(flat_cdf, context + u)
+            nxt = pos - context * n_states if targets is None else targets[pos]
+            states.append(nxt)
+            context = (context * n_states + nxt) % n_contexts
+        return states
+
+    def decode(self, indices, sep=""):
+        return sep.join(self.states[i] for i in indices)
+
+    def write_fasta(self, path, n_sequences, length, name="synthetic", line_width=FASTA_LINE_WIDTH,
+                    batch_bases=SAMPLE_BATCH_BASES):
+        """Streams n_sequences records to FASTA, generating batch_bases bases at a time."""
+        if any(len(state) != 1 for state in self.states):
+            raise ValueError("FASTA output needs single-character states.")
+        letters = np.frombuffer("".join(self.states).encode("ascii"), dtype=np.uint8)
+        batch = max(1, batch_bases // max(length, 1))
+        with open(path, "w") as f:
+            for first in range(0, n_sequences, batch):
+                block = self.generate(min(batch, n_sequences - first), length)
+                for i, row in enumerate(letters[block], start=first + 1):
+                    f.write(f">{name}_{i}\n")
+                    text = row.tobytes().decode("ascii")
+                    f.write("\n".join(text[j:j + line_width] for j in range(0, len(text), line_width)))
+                    f.write("\n")
+
+    @classmethod
+    def from_model(cls, model, seed=None):
+        return cls(model.matrix, STATES, model.order, seed)
+
+
+class CscMatrix:
+    """
+    Minimal column-compressed sparse matrix on top of numpy (no scipy here).
+    Column c holds the transition probabilities out of state c: rows
+    indices[indptr[c]:indptr[c + 1]] with values data[indptr[c]:indptr[c + 1]].
+    """
+
+    def __init__(self, indptr, indices, data, shape):
+        self.indptr = np.asarray(indptr)
+        self.indices = np.asarray(indices)
+        self.data = np.asarray(data)
+        self.shape = tuple(shape)
+        self._row_order = None
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def column(self, col):
+        lo, hi = self.indptr[col], self.indptr[col + 1]
+        return self.indices[lo:hi], self.data[lo:hi]
+
+    def dot(self, x):
+        """Matrix product with a vector or an (n_cols, batch) matrix."""
+        if self._row_order is None:
+            # regroup the non-zeros by row once, so products become one reduceat
+            cols = np.repeat(np.arange(self.shape[1]), np.diff(self.indptr))
+            order = np.argsort(self.indices, kind="stable")
+            row_ptr = np.searchsorted(self.indices[order], np.arange(self.shape[0] + 1))
+            self._row_order = (order, cols[order], row_ptr)
+        order, cols, row_ptr = self._row_order
+        x = np.asarray(x, dtype=np.float64)
+        # bound the (nnz, batch) temporary by handling a few columns at a time
+        width = max(1, SPARSE_DOT_ELEMENTS // max(self.nnz, 1))
+        if x.ndim == 2 and x.shape[1] > width:
+            return np.concatenate([self._dot(order, cols, row_ptr, x[:, b:b + width])
+                                   for b in range(0, x.shape[1], width)], axis=1)
+        return self._dot(order, cols, row_ptr, x)
+
+    def _dot(self, order, cols, row_ptr, x):
+        terms = self.data[order].reshape((-1,) + (1,) * (x.ndim - 1)) * x[cols]
+        out = np.zeros((self.shape[0],) + x.shape[1:])
+        nonempty = row_ptr[:-1] < row_ptr[1:]
+        if len(terms):
+            out[nonempty] = np.add.reduceat(terms, row_ptr[:-1][nonempty], axis=0)
+        return out
+
+    def toarray(self):
+        dense = np.zeros(self.shape)
+        dense[self.indices, np.repeat(np.arange(self.shape[1]), np.diff(self.indptr))] = self.data
+        return dense
+
+    @classmethod
+    def from_dense(cls, matrix):
+        matrix = np.asarray(matrix)
+        cols, rows = np.nonzero(matrix.T)
+        indptr = np.searchsorted(cols, np.arange(matrix.shape[1] + 1))
+        return cls(indptr, rows, matrix[rows, cols], matrix.shape)
+
+
+def apply_transition(matrix, vectors):
+    return matrix.dot(vectors) if isinstance(matrix, CscMatrix) else np.dot(matrix, vectors)
+
+
+def propagate(matrix, vectors, steps):
+    """
+    State distribution(s) after `steps` transitions. A dense matrix jumps there
+    with repeated squaring (np.linalg.matrix_power); a sparse one keeps multiplying
+    vectors, stopping early once they no longer change.
+    """
+    vectors = np.asarray(vectors, dtype=np.float64)
+    if not isinstance(matrix, CscMatrix):
+        return np.dot(np.linalg.matrix_power(np.asarray(matrix, dtype=np.float64), steps), vectors)
+    for _ in range(steps):
+        nxt = matrix.dot(vectors)
+        if np.abs(nxt - vectors).sum(axis=0).max() < STATIONARY_TOL:
+            return nxt
+        vectors = nxt
+    return vectors
+
+
+def stationary_distribution(matrix, max_iter=100_000):
+    """
+    Distribution pi with P pi = pi. Dense matrices use the eigenvector of the
+    eigenvalue closest to 1; sparse ones use power iteration on the lazy chain
+    (P + I) / 2, which has the same fixed point and also converges for
+    periodic chains.
+    """
+    if not isinstance(matrix, CscMatrix):
+        values, vectors = np.linalg.eig(np.asarray(matrix, dtype=np.float64))
+        pi = np.real(vectors[:, np.argmin(np.abs(values - 1))])
+        return pi / pi.sum()
+    pi = np.full(matrix.shape[0], 1.0 / matrix.shape[0])
+    for _ in range(max_iter):
+        nxt = 0.5 * (pi + matrix.dot(pi))
+        if np.abs(nxt - pi).sum() < STATIONARY_TOL:
+            return nxt
+        pi = nxt
+    return pi
+
+
+def _worst_distance(distributions, pi):
+    # largest total-variation distance to pi over the start states (columns)
+    return 0.5 * np.abs(distributions - pi[:, None]).sum(axis=0).max()
+
+
+def mixing_time(matrix, eps=MIXING_EPSILON, max_steps=MAX_MIXING_STEPS, seed=0):
+    """
+    Smallest t with max over start states of TV(P^t e_i, pi) <= eps, or None if
+    the chain has not mixed after max_steps (e.g. periodic or reducible chains).
+    Dense: exact, by squaring P until it is mixed and then binary lifting back down.
+    Sparse: step-by-step estimate from up to SPARSE_MIXING_STARTS sampled start states.
+    """
+    pi = stationary_distribution(matrix)
+    n = matrix.shape[0]
+    if isinstance(matrix, CscMatrix):
+        rng = np.random.default_rng(seed)
+        starts = np.arange(n) if n <= SPARSE_MIXING_STARTS else rng.choice(n, SPARSE_MIXING_STARTS, replace=False)
+        vectors = np.zeros((n, len(starts)))
+        vectors[starts, np.arange(len(starts))] = 1.0
+        for t in range(1, max_steps + 1):
+            vectors = matrix.dot(vectors)
+            if _worst_distance(vectors, pi) <= eps:
+                return t
+        return None
+
+    powers = [np.asarray(matrix, dtype=np.float64)]  # P^(2^k)
+    while _worst_distance(powers[-1], pi) > eps:
+        if 2 ** len(powers) > max_steps:
+            return None
+        powers.append(powers[-1] @ powers[-1])
+    current, t = np.eye(n), 0
+    for k in range(len(powers) - 2, -1, -1):
+        candidate = powers[k] @ current
+        if _worst_distance(candidate, pi) > eps:
+            current, t = candidate, t + 2 ** k
+    return t + 1 if _worst_distance(np.eye(n), pi) > eps else 0
+
+
+class StatePredictor:
+    """
+    Propagates one initial distribution, or a batch of them given as the columns
+    of an (n_states, batch) matrix, through a dense or CscMatrix transition matrix.
+    """
+
+    def __init__(self, transition_matrix, initial_vector):
+        self.matrix = transition_matrix if isinstance(transition_matrix, CscMatrix) else np.array(transition_matrix)
+        self.current_state = np.array(initial_vector)
+
+        if self.matrix.shape[0] != self.matrix.shape[1]:
+            raise ValueError("Input must be a square matrix.")
+        if self.matrix.shape[1] != len(self.current_state):
+            raise ValueError("Vector size must match matrix dimensions.")
+
+    def predict(self, steps=5):
+        predictions = []
+        for _ in range(steps):
+            next_state = apply_transition(self.matrix, self.current_state)
+            predictions.append(next_state)
+            self.current_state = next_state
+        return predictions
+
+    def predict_at(self, step):
+        """Distribution(s) at a single, possibly huge, step without keeping intermediates."""
+        return propagate(self.matrix, self.current_state, step)
+
+    def stationary(self):
+        return stationary_distribution(self.matrix)
+
+    def mixing_time(self, eps=MIXING_EPSILON):
+        return mixing_time(self.matrix, eps)
+
+
+def tokenize(text):
+    """Lower-case words with punctuation stripped, as TextTool splits its input."""
+    return PUNCTUATION.sub('', text).lower().split()
+
+
+class WordTrainer:
+    """
+    Builds a word-level chain without dense V x V arrays: words get ids from a
+    dict as they stream in, each chunk of tokens becomes an array of (current,
+    next) bigram keys, and np.unique merges their counts, so memory follows the
+    number of distinct bigrams rather than the corpus length or V squared.
+    """
+
+    def __init__(self):
+        self.vocab = {}
+        self.keys = np.empty(0, dtype=np.int64)  # current id << 32 | next id
+        self.counts = np.empty(0, dtype=np.int64)
+        self._last = None
+
+    def update(self, words):
+        if not words:
+            return
+        vocab = self.vocab
+        ids = np.fromiter((vocab.setdefault(w, len(vocab)) for w in words), dtype=np.int64, count=len(words))
+        if self._last is not None:
+            ids = np.concatenate(([self._last], ids))
+        self._last = int(ids[-1])
+        keys, counts = np.unique((ids[:-1] << 32) | ids[1:], return_counts=True)
+        keys, inverse = np.unique(np.concatenate((self.keys, keys)), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate((self.counts, counts)),
+                                  minlength=len(keys)).astype(np.int64)
+        self.keys = keys
+
+    def train_text(self, text):
+        self.update(tokenize(text))
+        return self.model()
+
+    def add_file(self, path, chunk_tokens=WORD_CHUNK_TOKENS):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            words = []
+            for line in f:
+                words.extend(tokenize(line))
+                if len(words) >= chunk_tokens:
+                    self.update(words)
+                    words = []
+            self.update(words)
+
+    def train_files(self, *paths, chunk_tokens=WORD_CHUNK_TOKENS):
+        for path in paths:
+            self.add_file(path, chunk_tokens)
+        return self.model()
+
+    def model(self):
+        """WordMarkovModel with alphabetically ordered words, as TextTool always used."""
+        words = list(self.vocab)
+        rank = np.empty(len(words), dtype=np.int64)
+        rank[np.argsort(np.array(words))] = np.arange(len(words))
+        cols = rank[self.keys >> 32]
+        rows = rank[self.keys & 0xFFFFFFFF]
+        counts = self.counts.astype(np.float64)
+        # a word never followed by another (the last token) loops on itself
+        dead_ends = np.setdiff1d(np.arange(len(words)), cols)
+        cols = np.concatenate((cols, dead_ends))
+        rows = np.concatenate((rows, dead_ends))
+        counts = np.concatenate((counts, np.ones(len(dead_ends))))
+
+        order = np.lexsort((rows, cols))
+        cols, rows, counts = cols[order], rows[order], counts[order]
+        totals = np.bincount(cols, weights=counts, minlength=len(words))
+        indptr = np.searchsorted(cols, np.arange(len(words) + 1))
+        matrix = CscMatrix(indptr, rows, counts / totals[cols], (len(words), len(words)))
+        return WordMarkovModel(sorted(words), matrix)
+
+
+class WordMarkovModel:
+    def __init__(self, words, matrix):
+        self.words = words    # state index -> word
+        self.matrix = matrix  # CscMatrix, column = current word, row = next word
+
+    @classmethod
+    def from_text(cls, text):
+        return WordTrainer().train_text(text)
+
+    @classmethod
+    def from_files(cls, *paths):
+        return WordTrainer().train_files(*paths)
+
+    def save(self, path, **metadata):
+        save_matrix(path, self.matrix, self.words, **metadata)
+
+    @classmethod
+    def load(cls, path, verify=False):
+        matrix, header = load_matrix(path, verify)
+        return cls(header["states"], matrix)
+
+
+def _aligned(offset):
+    return -(-offset // MODEL_ALIGN) * MODEL_ALIGN
+
+
+def write_model_file(path, arrays, **header):
+    """
+    Versioned binary model file: MODEL_MAGIC, the JSON header length (uint64 LE),
+    the JSON header (states, order, vocabulary, array layout, sha256 of the array
+    bytes), then every array as raw little-endian data on a MODEL_ALIGN boundary,
+    ready for np.memmap.
+    """
+    arrays = {name: np.ascontiguousarray(value, dtype=np.asarray(value).dtype.newbyteorder("<"))
+              for name, value in arrays.items()}
+    layout, offset = {}, 0
+    for name, value in arrays.items():
+        layout[name] = {"dtype": value.dtype.str, "shape": list(value.shape), "offset": offset}
+        offset = _aligned(offset + value.nbytes)
+    digest = hashlib.sha256()
+    for value in arrays.values():
+        digest.update(value.tobytes())
+    header = dict(header, version=MODEL_VERSION, arrays=layout, sha256=digest.hexdigest())
+    blob = json.dumps(header).encode("utf-8")
+    data_start = _aligned(len(MODEL_MAGIC) + 8 + len(blob))
+
+    with open(path, "wb") as f:
+        f.write(MODEL_MAGIC + struct.pack("<Q", len(blob)) + blob)
+        for name, value in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(value.tobytes())
+        f.truncate(data_start + offset)
+
+
+def read_model_file(path, verify=False):
+    """
+    (header, arrays) with every array memory-mapped read-only, so opening is
+    instant whatever the size and processes mapping the same file share its
+    pages. verify=True reads everything once to check the sha256.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MODEL_MAGIC)) != MODEL_MAGIC:
+            raise ValueError(f"{path} is not a Markov model file.")
+        (size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(size).decode("utf-8"))
+    if header["version"] > MODEL_VERSION:
+        raise ValueError(f"{path} uses model format version {header['version']}; this code reads up to {MODEL_VERSION}.")
+    data_start = _aligned(len(MODEL_MAGIC) + 8 + size)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.empty(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=data_start + spec["offset"], shape=shape)
+    if verify:
+        digest = hashlib.sha256()
+        for value in arrays.values():
+            digest.update(np.ascontiguousarray(value).tobytes())
+        if digest.hexdigest() != header["sha256"]:
+            raise ValueError(f"{path} is corrupted: checksum mismatch.")
+    return header, arrays
+
+
+def save_matrix(path, matrix, states, order=1, **metadata):
+    """Writes a dense or CscMatrix transition matrix (plus e.g. a symbol mapping) to a model file."""
+    if isinstance(matrix, CscMatrix):
+        arrays = {"indptr": matrix.indptr, "indices": matrix.indices, "data": matrix.data}
+        kind = "csc"
+    else:
+        arrays = {"matrix": np.asarray(matrix, dtype=np.float64)}
+        kind = "dense"
+    write_model_file(path, arrays, kind=kind, states=list(states), order=order, shape=list(matrix.shape),
+                     metadata=metadata)
+
+
+def load_matrix(path, verify=False):
+    """(matrix, header); the matrix is a memory-mapped array or a CscMatrix over memory-mapped arrays."""
+    header, arrays = read_model_file(path, verify)
+    if header["kind"] == "csc":
+        return CscMatrix(arrays["indptr"], arrays["indices"], arrays["data"], header["shape"]), header
+    return arrays["matrix"], header
+
+
+def export_json(path, matrix, mapping=None):
+    """
+    Compatibility shim for the old JSON files: a bare list of rows (dna_matrix.json),
+    or {"mapping", "matrix"} when a mapping is given (text_matrix.json). Sparse
+    models with more than JSON_DENSE_MAX_STATES states are written as CSC lists.
+    """
+    if isinstance(matrix, CscMatrix) and matrix.shape[0] > JSON_DENSE_MAX_STATES:
+        data = {"shape": list(matrix.shape), "indptr": matrix.indptr.tolist(),
+                "indices": matrix.indices.tolist(), "data": matrix.data.tolist()}
+    else:
+        dense = matrix.toarray() if isinstance(matrix, CscMatrix) else np.asarray(matrix)
+        data = {"matrix": dense.tolist()}
+    if mapping is not None:
+        data = dict(mapping=mapping, **data)
+    elif list(data) == ["matrix"]:
+        data = data["matrix"]
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def import_json(path):
+    """(matrix, mapping or None) from a file written by export_json or the old exercises."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return np.array(data), None
+    if "indptr" in data:
+        matrix = CscMatrix(np.array(data["indptr"], dtype=np.int64), np.array(data["indices"], dtype=np.int64),
+                           np.array(data["data"], dtype=np.float64), data["shape"])
+    else:
+        matrix = np.array(data["matrix"])
+    return matrix, data.get("mapping")
+
+
+def read_fasta_records(path):
+    """(name, encoded bases) for every record of a FASTA file."""
+    name, parts = None, []
+    with open(path, "rb") as f:
+        for line in f:
+            if line.startswith(b">"):
+                if name is not None:
+                    yield name, encode_sequence(b"".join(parts))
+                name, parts = line[1:].strip().decode("utf-8", "replace"), []
+            else:
+                parts.append(line.strip())
+    if name is not None:
+        yield name, encode_sequence(b"".join(parts))
+
+
+def log_probabilities(model, pseudocount=PSEUDOCOUNT):
+    """log2 P(next | context) of a MarkovModel, indexed by (k+1)-mer code, with additive smoothing."""
+    counts = model.counts.T.astype(np.float64) + pseudocount
+    return np.log2(counts / counts.sum(axis=1, keepdims=True)).ravel()
+
+
+def log_odds_table(plus, minus, pseudocount=PSEUDOCOUNT):
+    """
+    log2 P+(x | ctx) - log2 P-(x | ctx) for every (K+1)-mer, K the larger of the
+    two orders; the lower-order model just reads the end of the longer context.
+    """
+    order = max(plus.order, minus.order)
+    codes = np.arange(4 ** (order + 1))
+    table = log_probabilities(plus, pseudocount)[codes % 4 ** (plus.order + 1)]
+    return table - log_probabilities(minus, pseudocount)[codes % 4 ** (minus.order + 1)], order
+
+
+def log_odds_track(seq, plus, minus, window=SCORE_WINDOW, step=1, pseudocount=PSEUDOCOUNT):
+    """
+    float32 log-odds (bits) of every window start 0, step, 2*step, ... Each
+    base gets its transition score from one table lookup, and a cumulative sum
+    makes every window an O(1) difference. Transitions involving a non-ACGT
+    base score 0.
+    """
+    codes = encode_sequence(seq) if isinstance(seq, (str, bytes)) else np.asarray(seq)
+    table, order = log_odds_table(plus, minus, pseudocount)
+    n = len(codes)
+    if n < max(window, order + 1):
+        return np.empty(0, dtype=np.float32)
+    per_base = np.zeros(n)
+    transitions, valid = rolling_codes(codes, order + 1)
+    per_base[order:] = table[transitions]
+    if valid is not None:
+        per_base[order:][~valid] = 0.0
+    cumulative = np.concatenate(([0.0], np.cumsum(per_base)))
+    starts = np.arange(0, n - window + 1, step)
+    # a window scores the transitions whose whole context lies inside it
+    return (cumulative[starts + window] - cumulative[starts + order]).astype(np.float32)
+
+
+def call_segments(track, threshold=SCORE_THRESHOLD, window=SCORE_WINDOW, step=1):
+    """
+    Sequence intervals covered by windows scoring above threshold, as SEGMENT_DTYPE
+    records (start, end, best window score); overlapping windows merge into one.
+    """
+    hits = np.flatnonzero(track > threshold)
+    if not len(hits):
+        return np.empty(0, dtype=SEGMENT_DTYPE)
+    starts = hits * step
+    # a new segment begins where a window starts past every earlier window's end
+    new = np.ones(len(hits), dtype=bool)
+    new[1:] = starts[1:] > starts[:-1] + window
+    first = np.flatnonzero(new)
+    segments = np.empty(len(first), dtype=SEGMENT_DTYPE)
+    segments["start"] = starts[first]
+    segments["end"] = starts[np.append(first[1:], len(hits)) - 1] + window
+    segments["score"] = np.maximum.reduceat(track[hits], first)
+    return segments
+
+
+def score_sequences(records, plus, minus, window=SCORE_WINDOW, step=1, threshold=SCORE_THRESHOLD):
+    """
+    Yields (name, log-odds track, called segments) for (name, sequence) pairs, the
+    sequence as str, bytes or encoded codes, e.g. genomes from L8 Ex3's download_genome.
+    """
+    for name, seq in records:
+        track = log_odds_track(seq, plus, minus, window, step)
+        yield name, track, call_segments(track, threshold, window, step)
+
+
+def score_fasta(path, plus, minus, window=SCORE_WINDOW, step=1, threshold=SCORE_THRESHOLD):
+    """score_sequences over every record of a FASTA file, such as the genomes.fasta export of L8 Ex3."""
+    return score_sequences(read_fasta_records(path), plus, minus, window, step, threshold)
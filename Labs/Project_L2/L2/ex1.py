@@ -1,33 +1,42 @@
-from itertools import product
-import os, csv
+import os, sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))  # shared Labs/common modules
+from kmers import count_files_parallel, count_kmers
+from tk_worker import TkWorker
+
 
 # Without AI
 S = "TACGTGCGCGCGAGCTATCTACTGACTTACGACTAGTGTAGCTGCATCATCGATCGA".upper()
-ALPHABET = "ACGT"
-
-def groups(n):
-    return [''.join(p) for p in product(ALPHABET, repeat=n)]
+FASTA_EXTENSIONS = (".fasta", ".fa", ".fna", ".ffn")
+TABLE_NAMES = {2: "dinucleotides.kmc", 3: "trinucleotides.kmc"}
 
 def group_percent(sequence, n):
-    group = groups(n)
-    total_parts = len(sequence) - n + 1
-    counts = {group: 0 for group in group}
-
-    for i in range(total_parts):
-        part = sequence[i:i + n]
-        if len(part) == n:
-            counts[part] += 1
-
-    results = []
-    for group in sorted(group):
-        number = counts[group]
-        percent = (number * 100 / total_parts) if total_parts > 0 else 0
-        results.append((group, number, percent))
-
-    return results
+    """(group, count, percent) rows in alphabetical order; windows containing N or other symbols are skipped."""
+    return list(count_kmers(sequence, n).rows())
+
+def compute_tables(job, sequence):
+    """Worker job: the dinucleotide table is shown as soon as it is ready, then the trinucleotide one."""
+    counter2 = count_kmers(sequence, 2)
+    job.partial(list(counter2.rows()))
+    job.check()
+    job.progress("Counting trinucleotides…")
+    return counter2, count_kmers(sequence, 3)
+
+def count_folder(job, folder):
+    """Worker job: sums the di- and trinucleotide counts of every FASTA file in folder and saves the binary tables."""
+    paths = sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.lower().endswith(FASTA_EXTENSIONS))
+    if not paths:
+        raise ValueError(f"No FASTA files in {folder}.")
+    def progress(done, total):
+        job.check()
+        job.progress(f"Counting di- and trinucleotides: {done}/{total} files…")
+    # one pass over the files fills both tables
+    counters = count_files_parallel(paths, tuple(TABLE_NAMES), progress=progress)
+    for counter in counters:
+        counter.save(os.path.join(folder, TABLE_NAMES[counter.k]))
+    return len(paths), counters
 
 #Interface part using AI
 
@@ -45,7 +54,9 @@ class App(tk.Tk):
         self.title("Dinucleotide & Trinucleotide Percentages")
         self.geometry("900x620")
         self.minsize(820, 560)
+        self.counters = None
         self._build_ui()
+        self.worker = TkWorker(self, self.status)
         self._compute()
 
     def _build_ui(self):
@@ -56,7 +67,9 @@ class App(tk.Tk):
         self.seq_entry = ttk.Entry(top, textvariable=self.seq_var)
         self.seq_entry.pack(side="left", fill="x", expand=True, padx=8)
         ttk.Button(top, text="Compute", command=self._compute).pack(side="left", padx=4)
+        ttk.Button(top, text="Count FASTA Folder…", command=self._count_folder).pack(side="left", padx=4)
         ttk.Button(top, text="Save CSVs…", command=self._save_csvs).pack(side="left", padx=4)
+        ttk.Button(top, text="Cancel", command=lambda: self.worker.cancel()).pack(side="left", padx=4)
 
         self.nb = ttk.Notebook(self)
         self.nb.pack(fill="both", expand=True, padx=10, pady=10)
@@ -87,10 +100,28 @@ class App(tk.Tk):
 
     def _compute(self):
         s = self.seq_var.get().strip().upper()
-        rows2 = group_percent(s, 2)
-        rows3 = group_percent(s, 3)
-        self._fill(self.tree2, rows2)
-        self._fill(self.tree3, rows3)
+        self.status.set("Counting dinucleotides…")
+        self.worker.submit(compute_tables, s, on_done=lambda counters: self._show(s, *counters),
+                           on_partial=lambda rows2: self._fill(self.tree2, rows2))
+
+    def _count_folder(self):
+        folder = filedialog.askdirectory(title="Select a folder of FASTA files")
+        if not folder:
+            return
+        self.status.set("Counting…")
+        self.worker.submit(count_folder, folder, on_done=lambda result: self._show_folder(folder, *result))
+
+    def _show_folder(self, folder, n_files, counters):
+        self._set_tables(*counters)
+        self.status.set(f"Counted {n_files} files | tables saved as {' and '.join(TABLE_NAMES.values())} in {folder}")
+
+    def _set_tables(self, counter2, counter3):
+        self.counters = counter2, counter3
+        self._fill(self.tree2, counter2.rows())
+        self._fill(self.tree3, counter3.rows())
+
+    def _show(self, s, counter2, counter3):
+        self._set_tables(counter2, counter3)
         n = len(s)
         self.status.set(f"Computed: {n} bases | windows n=2: {max(0, n-1)} | n=3: {max(0, n-2)}")
 
@@ -100,22 +131,19 @@ class App(tk.Tk):
             tree.insert("", "end", values=(group, cnt, f"{pct:.2f}%"))
 
     def _save_csvs(self):
-        s = self.seq_var.get().strip().upper()
-        if not s:
-            messagebox.showwarning("Empty sequence", "Please input a DNA sequence.")
+        # saves the tables on screen, whether they came from the sequence box or a folder of files
+        if self.counters is None:
+            messagebox.showwarning("Nothing to save", "Compute the tables first.")
             return
         folder = filedialog.askdirectory(title="Select output folder")
         if not folder:
             return
-        rows2 = group_percent(s, 2)
-        rows3 = group_percent(s, 3)
+        counter2, counter3 = self.counters
         try:
             path2 = os.path.join(folder, "dinucleotides.csv")
             path3 = os.path.join(folder, "trinucleotides.csv")
-            with open(path2, "w", newline="") as f:
-                w = csv.writer(f); w.writerow(["dinucleotide","count","percentage"]); w.writerows(rows2)
-            with open(path3, "w", newline="") as f:
-                w = csv.writer(f); w.writerow(["trinucleotide","count","percentage"]); w.writerows(rows3)
+            counter2.export_csv(path2, "dinucleotide")
+            counter3.export_csv(path3, "trinucleotide")
             messagebox.showinfo("Saved", f"Saved:\n{path2}\n{path3}")
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -1,19 +1,12 @@
 #Find in sequence S only the dinucleo and trinucleo that exist, without the use of the bruteforce engine. In order to achive the results, one must check these combinations starting from the beginning of the sequence until the end of the sequence.
+from kmers import KmerPresence
+
 S="TACGTGCGCGCGAGCTATCTACTGACTTACGACTAGTGTAGCTGCATCATCGATCGA"
 
 S = S.upper()
 
-din = set()
-trin = set()
-
-for i in range(len(S) - 1):
-    di = S[i:i+2]
-    if len(di) == 2 and all(base in "ACGT" for base in di):
-        din.add(di)
-for i in range(len(S) - 2):
-    tri = S[i:i+3]
-    if len(tri) == 3 and all(base in "ACGT" for base in tri):
-        trin.add(tri)
+din = KmerPresence(2).update(S).present()
+trin = KmerPresence(3).update(S).present()
 
 print("Dinucleotides found in sequence:")
 print(sorted(din))
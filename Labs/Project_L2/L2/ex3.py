@@ -3,72 +3,85 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
 import os
+import sys
 import math
 
+import numpy as np
 import matplotlib
 matplotlib.use("TkAgg")
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))  # shared Labs/common modules
+from fasta_index import load_fasta
+from kmers import encode_sequence
+from tk_worker import TkWorker
 
-VALID = ("A", "C", "G", "T")
-
-def read_fasta_first_sequence(path: str) -> str:
-    seq_parts = []
-    with open(path, "r", encoding="utf-8") as f:
-        in_seq = False
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith(">"):
-                if in_seq and seq_parts:
-                    break
-                in_seq = True
-                continue
-            if in_seq:
-                seq_parts.append(line)
-    return "".join(seq_parts).upper()
 
+VALID = ("A", "C", "G", "T")
+MIN_PLOT_COLUMNS = 1000  # decimation target before the canvas has been laid out
+PREVIEW_WINDOWS = 20_000  # on longer inputs these first windows are drawn before the rest is computed
 
 def cumulative_counts(seq: str):
-    n = len(seq)
-    prefixes = {b: [0]*(n+1) for b in VALID}
-    for i, ch in enumerate(seq, start=1):
-        for b in VALID:
-            prefixes[b][i] = prefixes[b][i-1]
-        if ch in VALID:
-            prefixes[ch][i] += 1
+    """int32 prefix counts per base: pref[b][i] = occurrences of b in seq[:i]."""
+    codes = encode_sequence(seq)
+    prefixes = {}
+    for code, b in enumerate(VALID):
+        pref = np.zeros(len(codes) + 1, dtype=np.int32)
+        np.cumsum(codes == code, out=pref[1:])
+        prefixes[b] = pref
     return prefixes
 
-def window_frequencies(seq: str, k: int):
+def window_frequencies(seq: str, k: int, step: int = 1):
     if k <= 0:
         raise ValueError("Window size must be positive.")
+    if step <= 0:
+        raise ValueError("Step must be positive.")
     n = len(seq)
     if n < k:
-        return [], {b: [] for b in VALID}
+        return np.empty(0), {b: np.empty(0) for b in VALID}
 
     pref = cumulative_counts(seq)
 
-    x = []
-    freqs = {b: [] for b in VALID}
+    start = np.arange(0, n - k + 1, step)
+    end = start + k
+    counts = {b: pref[b][end] - pref[b][start] for b in VALID}
+    denom = sum(counts.values())
+    # windows made only of N (or other symbols) get frequency 0 for every base
+    scale = np.divide(1.0, denom, out=np.zeros(len(start)), where=denom > 0)
+    freqs = {b: counts[b] * scale for b in VALID}
 
     half = (k - 1) / 2.0
-    for start in range(0, n - k + 1):
-        end = start + k
-        counts = {b: pref[b][end] - pref[b][start] for b in VALID}
-        denom = sum(counts.values())
-        if denom == 0:
-            rel = {b: 0.0 for b in VALID}
-        else:
-            rel = {b: counts[b] / denom for b in VALID}
-        center_pos = start + half + 1
-        x.append(center_pos)
-        for b in VALID:
-            freqs[b].append(rel[b])
-
+    x = start + half + 1
     return x, freqs
 
+def decimate_minmax(x, freqs, max_points):
+    """
+    At most max_points points per line: the windows are split into max_points // 2
+    buckets and each keeps its minimum and maximum, so peaks survive the reduction.
+    """
+    n = len(x)
+    if n <= max_points:
+        return x, freqs
+    first = np.linspace(0, n, max_points // 2, endpoint=False).astype(np.int64)
+    last = np.append(first[1:], n) - 1
+    x_out = np.column_stack((x[first], x[last])).ravel()
+    freqs_out = {b: np.column_stack((np.minimum.reduceat(y, first), np.maximum.reduceat(y, first))).ravel()
+                 for b, y in freqs.items()}
+    return x_out, freqs_out
+
+def frequency_job(job, seq, k, step, max_points):
+    """Worker job: plots a preview of the first windows, then returns (window count, decimated x, freqs)."""
+    n_windows = (len(seq) - k) // step + 1
+    if n_windows > PREVIEW_WINDOWS:
+        x, freqs = window_frequencies(seq[:(PREVIEW_WINDOWS - 1) * step + k], k, step)
+        job.partial(decimate_minmax(x, freqs, max_points))
+        job.check()
+        job.progress(f"Showing the first {len(x):,} windows, computing all {n_windows:,}…")
+    x, freqs = window_frequencies(seq, k, step)
+    job.check()
+    return (len(x),) + decimate_minmax(x, freqs, max_points)
+
 
 class App(tk.Tk):
     def __init__(self):
@@ -78,6 +91,7 @@ class App(tk.Tk):
 
         self.seq = ""
         self.filepath = None
+        self.index = None
 
         top = ttk.Frame(self, padding=10)
         top.pack(side=tk.TOP, fill=tk.X)
@@ -91,13 +105,23 @@ class App(tk.Tk):
         self.win_entry = ttk.Entry(top, textvariable=self.win_var, width=6)
         self.win_entry.pack(side=tk.LEFT)
 
+        ttk.Label(top, text="Step:").pack(side=tk.LEFT, padx=(10,5))
+        self.step_var = tk.StringVar(value="1")
+        ttk.Entry(top, textvariable=self.step_var, width=6).pack(side=tk.LEFT)
+
         self.include_n_info = ttk.Label(top, text="(non A/C/G/T ignored in denominator)")
         self.include_n_info.pack(side=tk.LEFT, padx=10)
 
+        ttk.Button(top, text="Cancel", command=lambda: self.worker.cancel()).pack(side=tk.RIGHT, padx=(5, 0))
         ttk.Button(top, text="Analyze & Plot", command=self.analyze_and_plot).pack(side=tk.RIGHT)
 
         info = ttk.Frame(self, padding=(10, 0))
         info.pack(side=tk.TOP, fill=tk.X)
+        ttk.Label(info, text="Record:").pack(side=tk.LEFT)
+        self.record_var = tk.StringVar()
+        self.record_box = ttk.Combobox(info, textvariable=self.record_var, state="readonly", width=30)
+        self.record_box.pack(side=tk.LEFT, padx=(5, 15))
+        self.record_box.bind("<<ComboboxSelected>>", lambda event: self.load_record())
         self.stats_var = tk.StringVar(value="")
         ttk.Label(info, textvariable=self.stats_var, anchor="w").pack(side=tk.LEFT)
 
@@ -117,6 +141,8 @@ class App(tk.Tk):
         self.status_var = tk.StringVar(value="Load a FASTA file to begin.")
         ttk.Label(status, textvariable=self.status_var, anchor="w").pack(side=tk.LEFT)
 
+        self.worker = TkWorker(self, self.status_var)
+
     def open_fasta(self):
         path = filedialog.askopenfilename(
             title="Choose FASTA file",
@@ -124,21 +150,39 @@ class App(tk.Tk):
         )
         if not path:
             return
-        try:
-            seq = read_fasta_first_sequence(path)
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not read FASTA: {e}")
+
+        self.status_var.set(f"Indexing {os.path.basename(path)}…")
+        self.worker.submit(lambda job: load_fasta(path), on_done=self.set_index,
+                           on_error=lambda e: messagebox.showerror("Error", f"Could not read FASTA: {e}"))
+
+    def set_index(self, index):
+        if not len(index):
+            self.status_var.set("No sequence found.")
+            messagebox.showwarning("Empty", "No sequence found in the FASTA file.")
             return
 
+        self.index = index
+        self.filepath = index.path
+        self.file_lbl_var.set(f"{os.path.basename(index.path)} ({len(index)} records)")
+        self.record_box["values"] = index.names
+        self.record_var.set(index.names[0])
+        self.load_record()
+
+    def load_record(self):
+        index, name = self.index, self.record_var.get()
+        self.status_var.set(f"Reading {name}…")
+        self.worker.submit(lambda job: index.fetch(name).upper(), on_done=lambda seq: self.set_sequence(name, seq),
+                           on_error=lambda e: messagebox.showerror("Error", f"Could not read record: {e}"))
+
+    def set_sequence(self, name, seq):
         if not seq:
-            messagebox.showwarning("Empty", "No sequence found in the FASTA file.")
+            self.status_var.set(f"Record {name} is empty.")
+            messagebox.showwarning("Empty", f"Record {name} has no sequence.")
             return
 
         self.seq = seq
-        self.filepath = path
-        self.file_lbl_var.set(os.path.basename(path))
         self.stats_var.set(f"Sequence length: {len(seq):,} bp | Valid symbols counted: A,C,G,T")
-        self.status_var.set("File loaded. Set window size and click Analyze & Plot.")
+        self.status_var.set(f"{name} loaded. Set window size and click Analyze & Plot.")
 
     def analyze_and_plot(self):
         if not self.seq:
@@ -153,28 +197,45 @@ class App(tk.Tk):
             messagebox.showerror("Invalid window", "Window size must be a positive integer.")
             return
 
-        x, freqs = window_frequencies(self.seq, k)
+        try:
+            step = int(self.step_var.get())
+            if step <= 0:
+                raise ValueError
+        except Exception:
+            messagebox.showerror("Invalid step", "Step must be a positive integer.")
+            return
+
+        # no point drawing more than about two points per pixel column of the canvas
+        max_points = 2 * max(self.canvas_widget.winfo_width(), MIN_PLOT_COLUMNS)
+        self.status_var.set("Computing window frequencies…")
+        self.worker.submit(frequency_job, self.seq, k, step, max_points,
+                           on_partial=lambda result: self.plot(k, step, *result),
+                           on_done=lambda result: self.show_result(k, step, *result))
 
-        if not x:
+    def show_result(self, k, step, n_windows, x_plot, freqs_plot):
+        if not n_windows:
+            self.status_var.set("Sequence shorter than window size.")
             messagebox.showinfo("Too short", f"Sequence shorter than window size ({k}).")
             return
 
+        self.plot(k, step, x_plot, freqs_plot)
+        self.status_var.set(f"Plotted {n_windows:,} windows ({len(x_plot):,} points per line).")
+
+    def plot(self, k, step, x_plot, freqs_plot):
         self.ax.clear()
-        self.ax.set_title(f"Sliding-window (k={k}) relative frequencies")
+        self.ax.set_title(f"Sliding-window (k={k}, step={step}) relative frequencies")
         self.ax.set_xlabel("Window center (1-based position)")
         self.ax.set_ylabel("Relative frequency")
         self.ax.set_ylim(0, 1)
         self.ax.grid(True)
 
-        self.ax.plot(x, freqs["A"], label="A")
-        self.ax.plot(x, freqs["C"], label="C")
-        self.ax.plot(x, freqs["G"], label="G")
-        self.ax.plot(x, freqs["T"], label="T")
+        self.ax.plot(x_plot, freqs_plot["A"], label="A")
+        self.ax.plot(x_plot, freqs_plot["C"], label="C")
+        self.ax.plot(x_plot, freqs_plot["G"], label="G")
+        self.ax.plot(x_plot, freqs_plot["T"], label="T")
 
         self.ax.legend(loc="upper right")
         self.canvas.draw()
 
-        self.status_var.set(f"Plotted {len(x):,} windows.")
-
 if __name__ == "__main__":
     App().mainloop()
@@ -0,0 +1,402 @@
+#k-mer counting engine for the L2 exercises: bases packed as 2-bit codes, counted with numpy.
+
+import csv
+import multiprocessing
+import os
+import struct
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+ALPHABET = "ACGT"
+MAX_K = 31  # 2 * 31 bits fit in a uint64 code
+DENSE_MAX_K = 11  # up to here counts live in one bincount array of 4**k entries (32 MB at k = 11)
+COUNT_CHUNK_BASES = 4_000_000  # bases encoded per vectorized pass
+PRESENCE_MAX_K = 14  # a presence bitset holds 4**k bits: 32 MB at k = 14
+BATCHES_PER_WORKER = 4  # files are handed to worker processes in this many batches per core
+
+# count table file: header, then little-endian uint64 counts[4**k] (dense) or keys[n] + counts[n] (sparse)
+TABLE_MAGIC = b"L2KMERCT"
+TABLE_VERSION = 1
+TABLE_HEADER = struct.Struct("<8sHBB4sQQ")  # magic, version, k, flags, alphabet, entries, total
+TABLE_SPARSE = 1
+TABLE_CANONICAL = 2
+
+BASE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate(ALPHABET):
+    BASE_CODES[ord(_base)] = _code
+    BASE_CODES[ord(_base.lower())] = _code
+
+# masks that swap neighbouring 2, 4, 8, 16 and 32-bit groups of a uint64
+_SWAP_MASKS = [(np.uint64(shift), np.uint64(mask)) for shift, mask in (
+    (2, 0x3333333333333333), (4, 0x0F0F0F0F0F0F0F0F), (8, 0x00FF00FF00FF00FF),
+    (16, 0x0000FFFF0000FFFF), (32, 0x00000000FFFFFFFF))]
+
+
+def encode_sequence(seq):
+    """A/C/G/T -> 0..3 (either case); anything else (N, gaps, ...) -> 4."""
+    if isinstance(seq, str):
+        seq = seq.encode("ascii", "replace")
+    return BASE_CODES[np.frombuffer(seq, dtype=np.uint8)]
+
+
+def iter_fasta_sequences(path):
+    """Raw bytes of every record of a FASTA file, one record at a time."""
+    parts = []
+    with open(path, "rb") as f:
+        for line in f:
+            if line.startswith(b">"):
+                if parts:
+                    yield b"".join(parts)
+                parts = []
+            else:
+                parts.append(line.strip())
+    if parts:
+        yield b"".join(parts)
+
+
+def encode_kmer(kmer):
+    code = 0
+    for base in kmer.upper():
+        code = code * 4 + ALPHABET.index(base)
+    return code
+
+
+def decode_kmer(code, k):
+    return "".join(ALPHABET[(int(code) >> (2 * (k - 1 - i))) & 3] for i in range(k))
+
+
+def kmer_labels(k):
+    """All 4**k k-mers in code order, which is also alphabetical order."""
+    labels = [""]
+    for _ in range(k):
+        labels = [label + base for label in labels for base in ALPHABET]
+    return labels
+
+
+def kmer_codes(codes, k):
+    """
+    Rolling uint64 code of every k-long window of an encoded sequence, keeping only
+    windows made of A/C/G/T; a window containing N or any other symbol is dropped.
+    """
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K}.")
+    n = len(codes) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64)
+    is_bad = codes > 3
+    clean = np.where(is_bad, 0, codes).astype(np.uint64)
+    two = np.uint64(2)
+    window = clean[:n].copy()
+    for j in range(1, k):
+        window <<= two
+        window |= clean[j:j + n]
+    if is_bad.any():
+        bad = np.concatenate(([0], np.cumsum(is_bad, dtype=np.int64)))
+        window = window[bad[k:] == bad[:n]]
+    return window
+
+
+def reverse_complement_codes(window, k):
+    """Codes of the reverse complements: complement every base (3 - x), then reverse the 2-bit groups."""
+    x = ~np.asarray(window, dtype=np.uint64)
+    for shift, mask in _SWAP_MASKS:
+        x = ((x >> shift) & mask) | ((x & mask) << shift)
+    return x >> np.uint64(64 - 2 * k)
+
+
+def canonical_codes(window, k):
+    """The smaller of each k-mer code and its reverse complement's, so both strands count as one."""
+    return np.minimum(window, reverse_complement_codes(window, k))
+
+
+class KmerCounter:
+    """
+    k-mer counts over any number of sequences. Small k is counted densely with
+    np.bincount; larger k keeps a sorted array of the codes seen and their counts.
+    """
+
+    def __init__(self, k, canonical=False):
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}.")
+        self.k = k
+        self.canonical = canonical
+        self.dense = k <= DENSE_MAX_K
+        self.total = 0
+        if self.dense:
+            self.counts = np.zeros(4 ** k, dtype=np.int64)
+        else:
+            self.keys = np.empty(0, dtype=np.uint64)
+            self.counts = np.empty(0, dtype=np.int64)
+
+    def update(self, seq):
+        """Adds every k-mer of one sequence; k-mers never span two update calls."""
+        codes = encode_sequence(seq) if isinstance(seq, (str, bytes)) else np.asarray(seq)
+        step = COUNT_CHUNK_BASES
+        for start in range(0, max(len(codes) - self.k + 1, 0), step):
+            # consecutive chunks overlap by k - 1 bases so no window is lost or counted twice
+            window = kmer_codes(codes[start:start + step + self.k - 1], self.k)
+            if self.canonical:
+                window = canonical_codes(window, self.k)
+            self._add_codes(window)
+        return self
+
+    def _add_codes(self, window):
+        self.total += len(window)
+        if self.dense:
+            self.counts += np.bincount(window.astype(np.int64), minlength=len(self.counts))
+            return
+        self._merge_sparse(*np.unique(window, return_counts=True))
+
+    def _merge_sparse(self, keys, counts):
+        if len(self.keys):
+            keys = np.concatenate((self.keys, keys))
+            counts = np.concatenate((self.counts, counts))
+            order = np.argsort(keys, kind="stable")
+            keys, counts = keys[order], counts[order]
+            first = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+            keys, counts = keys[first], np.add.reduceat(counts, first)
+        self.keys, self.counts = keys, counts
+
+    def merge(self, other):
+        """Adds the counts of another table with the same k and strand mode."""
+        if (self.k, self.canonical) != (other.k, other.canonical):
+            raise ValueError("Count tables must have the same k and strand mode.")
+        self.total += other.total
+        if self.dense:
+            self.counts += other.counts
+        else:
+            self._merge_sparse(other.keys, other.counts)
+        return self
+
+    def items(self):
+        """(codes, counts) of every k-mer seen, sorted by code."""
+        if self.dense:
+            seen = np.flatnonzero(self.counts)
+            return seen.astype(np.uint64), self.counts[seen]
+        return self.keys, self.counts
+
+    def count(self, kmer):
+        code = encode_kmer(kmer)
+        if self.canonical:
+            code = int(canonical_codes(np.array([code], dtype=np.uint64), self.k)[0])
+        if self.dense:
+            return int(self.counts[code])
+        i = np.searchsorted(self.keys, np.uint64(code))
+        return int(self.counts[i]) if i < len(self.keys) and self.keys[i] == code else 0
+
+    def most_common(self, n=10):
+        codes, counts = self.items()
+        top = np.argsort(-counts, kind="stable")[:n]
+        return [(decode_kmer(codes[i], self.k), int(counts[i])) for i in top]
+
+    def rows(self):
+        """
+        (kmer, count, percent) in alphabetical order: every possible k-mer for dense
+        tables, only the k-mers seen otherwise (4**k rows would not fit).
+        """
+        if self.dense:
+            kmers, counts = kmer_labels(self.k), self.counts
+        else:
+            kmers, counts = [decode_kmer(code, self.k) for code in self.keys], self.counts
+        for kmer, number in zip(kmers, counts.tolist()):
+            yield kmer, number, (number * 100 / self.total) if self.total > 0 else 0
+
+    def export_csv(self, path, label="kmer"):
+        with open(path, "w", newline="") as f:
+            w = csv.writer(f); w.writerow([label, "count", "percentage"]); w.writerows(self.rows())
+
+    def save(self, path):
+        """Writes the table in whichever layout is smaller; see TABLE_HEADER."""
+        codes, counts = self.items()
+        sparse = 2 * len(codes) < 4 ** self.k
+        flags = (TABLE_SPARSE if sparse else 0) | (TABLE_CANONICAL if self.canonical else 0)
+        body = (codes, counts) if sparse else (self.counts if self.dense else self._dense_counts(),)
+        with open(path, "wb") as f:
+            f.write(TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, self.k, flags, ALPHABET.encode(),
+                                      len(body[0]), self.total))
+            for array in body:
+                f.write(np.ascontiguousarray(array, dtype="<u8").tobytes())
+
+    def _dense_counts(self):
+        counts = np.zeros(4 ** self.k, dtype=np.int64)
+        counts[self.keys.astype(np.int64)] = self.counts
+        return counts
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            header = f.read(TABLE_HEADER.size)
+        if len(header) < TABLE_HEADER.size:
+            raise ValueError(f"{path}: not a k-mer count table.")
+        magic, version, k, flags, alphabet, entries, total = TABLE_HEADER.unpack(header)
+        if magic != TABLE_MAGIC or alphabet != ALPHABET.encode():
+            raise ValueError(f"{path}: not a k-mer count table.")
+        if version > TABLE_VERSION:
+            raise ValueError(f"{path}: count table version {version} is newer than this reader ({TABLE_VERSION}).")
+        sparse = bool(flags & TABLE_SPARSE)
+        body = np.fromfile(path, dtype="<u8", offset=TABLE_HEADER.size)
+        if len(body) != (2 if sparse else 1) * entries or (not sparse and entries != 4 ** k):
+            raise ValueError(f"{path}: truncated or corrupt count table.")
+        counter = cls(k, bool(flags & TABLE_CANONICAL))
+        counter.total = total
+        if sparse:
+            keys, counts = body[:entries].astype(np.uint64), body[entries:].astype(np.int64)
+        else:
+            keys = np.flatnonzero(body).astype(np.uint64)
+            counts = body[keys.astype(np.int64)].astype(np.int64)
+        if counter.dense:
+            counter.counts[keys.astype(np.int64)] = counts
+        else:
+            counter.keys, counter.counts = keys, counts
+        return counter
+
+
+def count_kmers(seq, k, canonical=False):
+    return KmerCounter(k, canonical).update(seq)
+
+
+def _k_tuple(k):
+    return k if isinstance(k, tuple) else (k,)
+
+
+def count_files(paths, k, canonical=False):
+    """
+    One KmerCounter summed over every record of every FASTA file in paths. k may also
+    be a tuple of sizes: each record is then read and encoded once for all of them,
+    and a list with one counter per k is returned.
+    """
+    counters = [KmerCounter(n, canonical) for n in _k_tuple(k)]
+    for path in paths:
+        for seq in iter_fasta_sequences(path):
+            codes = encode_sequence(seq)
+            for counter in counters:
+                counter.update(codes)
+    return counters if isinstance(k, tuple) else counters[0]
+
+
+def count_files_parallel(paths, k, canonical=False, processes=None, progress=None):
+    """
+    Map-reduce over many FASTA files: worker processes count batches of files and
+    the tables they return are merged as they arrive. k may be a tuple of sizes, as
+    for count_files, to count all of them in the same pass. progress(files_done,
+    n_files) is called after each batch; an exception it raises stops the remaining work.
+    """
+    paths = list(paths)
+    processes = min(processes or os.cpu_count() or 1, max(len(paths), 1))
+    n_batches = min(len(paths), processes * BATCHES_PER_WORKER)
+    batches = [paths[i::n_batches] for i in range(n_batches)]
+    ks = _k_tuple(k)
+    totals = [KmerCounter(n, canonical) for n in ks]
+    # spawn, so workers never inherit the state (Tk, threads) of a GUI parent
+    pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        pending = {pool.submit(count_files, batch, ks, canonical): len(batch) for batch in batches}
+        done_files = 0
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for total, counter in zip(totals, future.result()):
+                    total.merge(counter)
+                done_files += pending.pop(future)
+            if progress is not None:
+                progress(done_files, len(paths))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return totals if isinstance(k, tuple) else totals[0]
+
+
+class KmerPresence:
+    """
+    Which of the 4**k k-mers occur, as a packed bitset (bit = code, little-endian
+    within each byte). Panels of genomes combine with |, & and -; ~ gives the absent
+    words. With both_strands a k-mer also counts as present when its reverse
+    complement occurs.
+    """
+
+    def __init__(self, k, both_strands=False, bits=None):
+        if not 1 <= k <= PRESENCE_MAX_K:
+            raise ValueError(f"k must be between 1 and {PRESENCE_MAX_K}.")
+        self.k = k
+        self.both_strands = both_strands
+        self.size = 4 ** k
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8) if bits is None else bits
+
+    @classmethod
+    def from_fasta(cls, path, k, both_strands=False):
+        presence = cls(k, both_strands)
+        for seq in iter_fasta_sequences(path):
+            presence.update(seq)
+        return presence
+
+    def update(self, seq):
+        codes = encode_sequence(seq) if isinstance(seq, (str, bytes)) else np.asarray(seq)
+        step = COUNT_CHUNK_BASES
+        for start in range(0, max(len(codes) - self.k + 1, 0), step):
+            window = kmer_codes(codes[start:start + step + self.k - 1], self.k)
+            if self.both_strands:
+                window = np.concatenate((window, reverse_complement_codes(window, self.k)))
+            self._set(window)
+        return self
+
+    def _set(self, codes):
+        # unbuffered OR, so codes (in any order, repeats allowed) that share a byte all keep their bit
+        byte = (codes >> np.uint64(3)).astype(np.int64)
+        bit = np.left_shift(1, codes & np.uint64(7)).astype(np.uint8)
+        np.bitwise_or.at(self.bits, byte, bit)
+
+    def _combine(self, other, bits):
+        if (self.k, self.both_strands) != (other.k, other.both_strands):
+            raise ValueError("Presence sets must have the same k and strand mode.")
+        return KmerPresence(self.k, self.both_strands, bits)
+
+    def __or__(self, other):
+        return self._combine(other, self.bits | other.bits)
+
+    def __and__(self, other):
+        return self._combine(other, self.bits & other.bits)
+
+    def __sub__(self, other):
+        return self._combine(other, self.bits & ~other.bits)
+
+    def __invert__(self):
+        bits = ~self.bits
+        if self.size % 8:
+            bits[-1] &= (1 << self.size % 8) - 1  # only k = 1 leaves a partial byte
+        return KmerPresence(self.k, self.both_strands, bits)
+
+    def __contains__(self, kmer):
+        code = encode_kmer(kmer)
+        return bool(self.bits[code >> 3] >> (code & 7) & 1)
+
+    def __len__(self):
+        return int(np.unpackbits(self.bits).sum())
+
+    def codes(self):
+        """Codes of the k-mers present, in increasing order."""
+        return np.flatnonzero(np.unpackbits(self.bits, count=self.size, bitorder="little"))
+
+    def present(self):
+        return [decode_kmer(code, self.k) for code in self.codes()]
+
+    def absent(self):
+        """The nullomers: k-mers that never occur."""
+        return (~self).present()
+
+
+def shortest_absent_words(paths, max_k=PRESENCE_MAX_K, both_strands=True):
+    """
+    Smallest k at which some k-mer is missing from every FASTA file in paths, and
+    those k-mers; (None, []) when every k-mer up to max_k occurs somewhere.
+    """
+    unions = [KmerPresence(k, both_strands) for k in range(1, max_k + 1)]
+    for path in paths:
+        for seq in iter_fasta_sequences(path):
+            codes = encode_sequence(seq)  # read and encoded once, then set in the bitsets of every k
+            for union in unions:
+                union.update(codes)
+    for union in unions:
+        missing = ~union
+        if missing.bits.any():
+            return union.k, missing.present()
+    return None, []
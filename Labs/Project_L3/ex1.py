@@ -9,7 +9,7 @@ def calc_temp(dna_seq):
     g_count = dna_seq.count('G')
     Na = 0.001
     tm = 2 * (a_count + t_count) + 4 * (c_count + g_count)
-    tm1 = 81.5 + 16.6 * (math.log(10)*Na) + 0.41 * ((c_count + g_count) / len(dna_seq) * 100) - (600 / len(dna_seq))
+    tm1 = 81.5 + 16.6 * math.log10(Na) + 0.41 * ((c_count + g_count) / len(dna_seq) * 100) - (600 / len(dna_seq))
     return tm, tm1
 
 dna_sequence = input("Enter a DNA sequence: ")
@@ -2,19 +2,96 @@
 #Do the plotting graph for the sliding window.
 
 import math
+import numpy as np
 import matplotlib.pyplot as plt
 
-def sw_tm(dna_seq, window_size=8):
-    tm_val = []
-    for i in range(len(dna_seq) - window_size + 1):
-        win = dna_seq[i:i + window_size]
-        a_count = win.count('A')
-        t_count = win.count('T')
-        c_count = win.count('C')
-        g_count = win.count('G')
-        tm = 2 * (a_count + t_count) + 4 * (c_count + g_count)
-        tm_val.append((i, tm))
-    return tm_val
+NA_CONCENTRATION = 0.001  # mol/L of Na+; calc_temp (ex1) uses the same salt term, 16.6 log10[Na+]
+PRIMER_CONCENTRATION = 250e-9  # mol/L of each strand, for the nearest-neighbour Tm
+GAS_CONSTANT = 1.987  # cal/(K*mol)
+TM_METHODS = ("wallace", "salt", "nn")
+
+BASE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate("ACGT"):
+    BASE_CODES[ord(_base)] = _code
+    BASE_CODES[ord(_base.lower())] = _code
+
+# SantaLucia (1998) unified nearest-neighbour parameters, dH in kcal/mol and dS in cal/(K*mol),
+# for every 5'->3' dinucleotide of the top strand (AA and TT are the same AA/TT stack, etc.)
+NN_STACKS = {
+    "AA": (-7.9, -22.2), "TT": (-7.9, -22.2), "AT": (-7.2, -20.4), "TA": (-7.2, -21.3),
+    "CA": (-8.5, -22.7), "TG": (-8.5, -22.7), "GT": (-8.4, -22.4), "AC": (-8.4, -22.4),
+    "CT": (-7.8, -21.0), "AG": (-7.8, -21.0), "GA": (-8.2, -22.2), "TC": (-8.2, -22.2),
+    "CG": (-10.6, -27.2), "GC": (-9.8, -24.4), "GG": (-8.0, -19.9), "CC": (-8.0, -19.9),
+}
+NN_INIT_GC = (0.1, -2.8)  # initiation for each duplex end closed by G or C
+NN_INIT_AT = (2.3, 4.1)  # ... and by A or T
+
+STACK_DH = np.zeros(25)
+STACK_DS = np.zeros(25)
+for _pair, (_dh, _ds) in NN_STACKS.items():
+    STACK_DH[BASE_CODES[ord(_pair[0])] * 5 + BASE_CODES[ord(_pair[1])]] = _dh
+    STACK_DS[BASE_CODES[ord(_pair[0])] * 5 + BASE_CODES[ord(_pair[1])]] = _ds
+# indexed by base code: C and G close with NN_INIT_GC, everything else with NN_INIT_AT
+END_DH = np.array([NN_INIT_AT[0], NN_INIT_GC[0], NN_INIT_GC[0], NN_INIT_AT[0], NN_INIT_AT[0]])
+END_DS = np.array([NN_INIT_AT[1], NN_INIT_GC[1], NN_INIT_GC[1], NN_INIT_AT[1], NN_INIT_AT[1]])
+
+
+def tm_profiles(dna_seq, window_size=8, methods=TM_METHODS, na=NA_CONCENTRATION, primer_conc=PRIMER_CONCENTRATION):
+    """
+    Tm (degrees C) of every window as numpy arrays: (window starts, {method: tm}).
+    wallace: 2(A+T) + 4(G+C); salt: 81.5 + 16.6 log10[Na+] + 0.41 %GC - 600/N;
+    nn: SantaLucia nearest-neighbour with the entropy salt correction.
+    Base counts and stack energies come from cumulative sums, so every window costs
+    O(1) whatever its size. Symbols other than A/C/G/T count as neither AT nor GC
+    and break the stacks they are part of.
+    """
+    if window_size <= 0:
+        raise ValueError("Window size must be positive.")
+    codes = BASE_CODES[np.frombuffer(dna_seq.encode("ascii", "replace"), dtype=np.uint8)]
+    n_windows = len(codes) - window_size + 1
+    if n_windows <= 0:
+        return np.empty(0, dtype=np.int64), {method: np.empty(0) for method in methods}
+    # windows are consecutive, so "value at window end - value at window start" is a difference of two slices
+    gc = np.zeros(len(codes) + 1, dtype=np.int32)
+    np.cumsum((codes == 1) | (codes == 2), out=gc[1:])
+    at = np.zeros(len(codes) + 1, dtype=np.int32)
+    np.cumsum((codes == 0) | (codes == 3), out=at[1:])
+    gc_count = gc[window_size:] - gc[:n_windows]
+    at_count = at[window_size:] - at[:n_windows]
+
+    profiles = {}
+    for method in methods:
+        if method == "wallace":
+            profiles[method] = (2 * at_count + 4 * gc_count).astype(np.float64)
+        elif method == "salt":
+            profiles[method] = (81.5 + 16.6 * math.log10(na) + 0.41 * (gc_count * 100 / window_size)
+                                - 600 / window_size)
+        elif method == "nn":
+            profiles[method] = _nn_profile(codes, n_windows, window_size, na, primer_conc)
+        else:
+            raise ValueError(f"Unknown Tm method '{method}', expected one of {TM_METHODS}.")
+    return np.arange(n_windows), profiles
+
+
+def _nn_profile(codes, n_windows, window_size, na, primer_conc):
+    # stack i joins bases i and i + 1, so a window starting at s holds stacks s .. s + window_size - 2
+    pairs = codes[:-1].astype(np.intp) * 5 + codes[1:]
+    dh = np.zeros(len(codes))
+    np.cumsum(STACK_DH[pairs], out=dh[1:])
+    ds = np.zeros(len(codes))
+    np.cumsum(STACK_DS[pairs], out=ds[1:])
+    last = window_size - 1
+    end_dh, end_ds = END_DH[codes], END_DS[codes]
+    dh_window = dh[last:] - dh[:n_windows] + end_dh[:n_windows] + end_dh[last:]
+    ds_window = (ds[last:] - ds[:n_windows] + end_ds[:n_windows] + end_ds[last:]
+                 + 0.368 * (window_size - 1) * math.log(na))
+    return 1000 * dh_window / (ds_window + GAS_CONSTANT * math.log(primer_conc / 4)) - 273.15
+
+
+def sw_tm(dna_seq, window_size=8, method="wallace"):
+    """(window starts, Tm) arrays for one method; see tm_profiles."""
+    starts, profiles = tm_profiles(dna_seq, window_size, (method,))
+    return starts, profiles[method]
 
 def read_fasta(file_path):
     with open(file_path, 'r') as file:
@@ -22,18 +99,17 @@ def read_fasta(file_path):
         seq = ''.join(line.strip() for line in lines if not line.startswith('>'))
         return seq
     
-def plot_tm(tm_values):
-    positions, tm = zip(*tm_values)
-    plt.plot(positions, tm)
+def plot_tm(positions, profiles):
+    for label, tm in profiles.items():
+        plt.plot(positions, tm, label=label)
     plt.xlabel('Position')
-    plt.ylabel('Melting Temperature (Tm)')
+    plt.ylabel('Melting Temperature (Tm, °C)')
     plt.title('Sliding Window Melting Temperature')
+    plt.legend()
     plt.show()
-fasta_file = input("Enter the path to the FASTA file: ")
-sequence = read_fasta(fasta_file)
-tm_values = sw_tm(sequence)
-plot_tm(tm_values)
-
-
-
 
+if __name__ == "__main__":
+    fasta_file = input("Enter the path to the FASTA file: ")
+    sequence = read_fasta(fasta_file)
+    positions, profiles = tm_profiles(sequence)
+    plot_tm(positions, profiles)
@@ -1,48 +1,322 @@
-import re
+import mmap
+import struct
+import zlib
+from itertools import combinations
 from pathlib import Path
 
+import numpy as np
+
+IUPAC_CODES = {
+    "A": "A", "C": "C", "G": "G", "T": "T",
+    "R": "AG", "Y": "CT", "S": "CG", "W": "AT", "K": "GT", "M": "AC",
+    "B": "CGT", "D": "AGT", "H": "ACT", "V": "ACG", "N": "ACGT",
+}
+IUPAC_COMPLEMENT = str.maketrans("ACGTRYSWKMBDHVN", "TGCAYRSWMKVHDBN")
+MAX_SITE_LEN = 31  # 2 bits per base must fit in a uint64 window code
+DENSE_LOOKUP_MAX_LEN = 10  # shorter sites use a 4**len direct table instead of a binary search
+
+DIGEST_CHUNK_SIZE = 4_000_000  # bases per chunk in the streaming digest
+
+GEL_PNG_PATH = "gel.png"
+GEL_LADDER = (10000, 8000, 6000, 5000, 4000, 3000, 2000, 1500, 1000, 750, 500, 250)
+GEL_HEIGHT = 600       # pixels from the wells to the bottom of the gel
+GEL_MARGIN = 20        # pixels above the wells / below the lowest band
+LANE_WIDTH = 12
+LANE_GAP = 4
+BAND_HEIGHT = 3
+GEL_RESOLUTION = 2     # bands closer than this many pixels co-migrate into one
+
+BASE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate("ACGT"):
+    BASE_CODES[ord(_base)] = _code
+    BASE_CODES[ord(_base.lower())] = _code
+
+
+def encode_sequence(dna_seq):
+    if isinstance(dna_seq, str):
+        dna_seq = dna_seq.encode("ascii")
+    return BASE_CODES[np.frombuffer(dna_seq, dtype=np.uint8)]
+
+
+def reverse_complement_site(site):
+    return site.translate(IUPAC_COMPLEMENT)[::-1]
+
+
+def expand_site(site):
+    """All concrete A/C/G/T words matched by an IUPAC recognition sequence."""
+    words = [""]
+    for symbol in site:
+        words = [word + base for word in words for base in IUPAC_CODES[symbol]]
+    return words
+
 
 class RestrictionEnzyme:
     def __init__(self, name, recognition_seq, cut_offset):
         self.name = name
         self.recognition_seq = recognition_seq.upper()
         self.cut_offset = cut_offset  # position inside recognition sequence where cut happens (0-based)
+        unknown = set(self.recognition_seq) - set(IUPAC_CODES)
+        if unknown:
+            raise ValueError(f"{name}: unknown symbols {sorted(unknown)} in recognition sequence.")
+        if not 0 < len(self.recognition_seq) <= MAX_SITE_LEN:
+            raise ValueError(f"{name}: recognition sequence must be 1-{MAX_SITE_LEN} bases long.")
+
+    @property
+    def is_palindromic(self):
+        return reverse_complement_site(self.recognition_seq) == self.recognition_seq
+
+    def site_words(self):
+        """
+        (word, cut offset from the word start) pairs to look for on the top strand.
+        A non-palindromic site is also searched as its reverse complement; there the
+        enzyme reads the bottom strand, so the cut lands at len(site) - cut_offset.
+        """
+        words = [(word, self.cut_offset) for word in expand_site(self.recognition_seq)]
+        if not self.is_palindromic:
+            bottom_cut = len(self.recognition_seq) - self.cut_offset
+            words += [(word, bottom_cut) for word in expand_site(reverse_complement_site(self.recognition_seq))]
+        return words
+
+    def find_cleavage_sites(self, dna_seq, circular=False):
+        return EnzymeSet([self]).find_cleavage_sites(dna_seq, circular)[self.name]
+
+    def digest(self, dna_seq, circular=False):
+        sites = self.find_cleavage_sites(dna_seq, circular)
+        return sites, compute_fragments_from_sites(len(dna_seq), sites, circular)
+
+
+class EnzymeSet:
+    """
+    Compiles a library of enzymes into one lookup of 2-bit window codes, so a
+    single pass over the sequence reports every (overlapping) site of every enzyme.
+    """
 
-    def find_cleavage_sites(self, dna_seq):
-        dna_seq = dna_seq.upper()
-        recog_len = len(self.recognition_seq)
-        sites = []
-        for match in re.finditer(self.recognition_seq, dna_seq):
-            start = match.start()
-            cut_position = start + self.cut_offset
-            sites.append(cut_position)
-        return sorted(sites)
-
-    def digest(self, dna_seq):
+    def __init__(self, enzymes):
+        self.enzymes = list(enzymes)
+        self.names = [enzyme.name for enzyme in self.enzymes]
+        entries = {}
+        for idx, enzyme in enumerate(self.enzymes):
+            for word, cut in enzyme.site_words():
+                entries.setdefault(len(word), {}).setdefault(word, set()).add((idx, cut))
+
+        # per site length: sorted word codes plus a CSR list of (enzyme, cut) per word
+        self.tables = []
+        for length in sorted(entries):
+            words = entries[length]
+            codes = np.array([self._word_code(word) for word in words], dtype=np.uint64)
+            order = np.argsort(codes)
+            hits = [sorted(words[word]) for word in words]
+            ptr = np.zeros(len(words) + 1, dtype=np.int64)
+            ptr[1:] = np.cumsum([len(hits[i]) for i in order])
+            flat = [pair for i in order for pair in hits[i]]
+            dense = None
+            if length <= DENSE_LOOKUP_MAX_LEN:
+                dense = np.full(4 ** length, -1, dtype=np.int32)
+                dense[codes[order].astype(np.int64)] = np.arange(len(words), dtype=np.int32)
+            self.tables.append((length, codes[order], dense, ptr,
+                                np.array([e for e, _ in flat], dtype=np.int32),
+                                np.array([c for _, c in flat], dtype=np.int64)))
+        self.max_site_len = max((table[0] for table in self.tables), default=0)
+
+    @staticmethod
+    def _word_code(word):
+        code = 0
+        for base in word:
+            code = (code << 2) | "ACGT".index(base)
+        return code
+
+    def scan_codes(self, codes, offset=0, new_from=0):
+        """
+        Raw hits in an encoded sequence: (enzyme index, cut position) arrays,
+        positions shifted by `offset`. Cuts are not clipped to the sequence.
+        Only windows ending at index >= new_from are reported, so a chunk can
+        carry the tail of the previous one without repeating its hits.
+        """
+        n = len(codes)
+        bad = np.concatenate(([0], np.cumsum(codes > 3, dtype=np.int64)))
+        clean = np.where(codes > 3, 0, codes).astype(np.uint64)
+        enzymes_out, cuts_out = [], []
+        window = np.zeros(n, dtype=np.uint64)
+        built = 0
+        for length, keys, dense, ptr, entry_enzyme, entry_cut in self.tables:
+            if length > n:
+                break
+            while built < length:
+                window = (window[:n - built] << np.uint64(2)) | clean[built:]
+                built += 1
+            valid = bad[length:] == bad[:n - length + 1]
+            valid[:max(new_from - length + 1, 0)] = False
+            if dense is not None:
+                pos = dense[window.astype(np.intp)]
+                starts = np.flatnonzero((pos >= 0) & valid)
+            else:
+                pos = np.minimum(np.searchsorted(keys, window), len(keys) - 1)
+                starts = np.flatnonzero((keys[pos] == window) & valid)
+            if not len(starts):
+                continue
+            kid = pos[starts]
+            counts = ptr[kid + 1] - ptr[kid]
+            first = np.cumsum(counts) - counts
+            entry = np.repeat(ptr[kid] - first, counts) + np.arange(counts.sum())
+            enzymes_out.append(entry_enzyme[entry])
+            cuts_out.append(np.repeat(starts, counts) + entry_cut[entry] + offset)
+        if not enzymes_out:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        return np.concatenate(enzymes_out), np.concatenate(cuts_out)
+
+    def site_arrays(self, dna_seq, circular=False):
+        """
+        Sorted, de-duplicated cut positions per enzyme (one int64 array each).
+        A circular molecule is scanned with its start appended, so sites across
+        the origin are found; their cuts wrap back into [0, len).
+        """
         dna_len = len(dna_seq)
-        sites = self.find_cleavage_sites(dna_seq)
-        fragments = []
-        if not sites:
-            fragments.append((0, dna_len))
-            return sites, fragments
-        prev = 0
-        for s in sites:
-            fragments.append((prev, s))
-            prev = s
-        fragments.append((prev, dna_len))
-        return sites, fragments
+        codes = encode_sequence(dna_seq)
+        if circular and dna_len:
+            codes = np.concatenate((codes, np.resize(codes, self.max_site_len - 1)))
+        enzyme_idx, cuts = self.scan_codes(codes)
+        if circular and dna_len:
+            return self.group_sites(enzyme_idx, cuts % dna_len)
+        keep = (cuts > 0) & (cuts < dna_len)
+        return self.group_sites(enzyme_idx[keep], cuts[keep])
+
+    def group_sites(self, enzyme_idx, cuts):
+        if not len(cuts):
+            return [np.empty(0, dtype=np.int64) for _ in self.enzymes]
+        # sort (enzyme, cut) pairs as one int64 key, then drop repeats
+        low = cuts.min()
+        span = cuts.max() - low + 1
+        keys = np.sort(enzyme_idx.astype(np.int64) * span + (cuts - low))
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        enzyme_idx, cuts = np.divmod(keys, span)
+        bounds = np.searchsorted(enzyme_idx, np.arange(len(self.enzymes) + 1))
+        return [cuts[bounds[i]:bounds[i + 1]] + low for i in range(len(self.enzymes))]
+
+    def find_cleavage_sites(self, dna_seq, circular=False):
+        return {name: sites.tolist() for name, sites in zip(self.names, self.site_arrays(dna_seq, circular))}
+
+    def digest(self, dna_seq, circular=False):
+        """dict[name -> (sites, fragments)] plus the combined digest under `None`."""
+        return self.digest_from_sites(len(dna_seq), self.site_arrays(dna_seq, circular), circular)
+
+    def digest_from_sites(self, dna_len, site_arrays, circular=False):
+        result = {name: (sites.tolist(), compute_fragments_from_sites(dna_len, sites, circular))
+                  for name, sites in zip(self.names, site_arrays)}
+        combined = np.unique(np.concatenate(site_arrays)) if site_arrays else np.empty(0, dtype=np.int64)
+        result[None] = (combined.tolist(), compute_fragments_from_sites(dna_len, combined, circular))
+        return result
+
+
+def fasta_sequence_ranges(buffer):
+    """(start, end) byte ranges of the sequence lines of every record in a FASTA buffer."""
+    ranges = []
+    pos, size = 0, len(buffer)
+    while pos < size:
+        if buffer[pos:pos + 1] == b">":
+            eol = buffer.find(b"\n", pos)
+            pos = size if eol < 0 else eol + 1
+            continue
+        next_header = buffer.find(b"\n>", pos)
+        end = size if next_header < 0 else next_header + 1
+        ranges.append((pos, end))
+        pos = end
+    return ranges
+
+
+def iter_fasta_codes(path, chunk_size=DIGEST_CHUNK_SIZE):
+    """
+    Memory-maps a FASTA file and yields its bases as 2-bit code arrays of about
+    chunk_size bytes each (records are concatenated, as in load_fasta_sequence).
+    """
+    with open(path, "rb") as f:
+        if not f.seek(0, 2):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for start, end in fasta_sequence_ranges(buffer):
+                for chunk_start in range(start, end, chunk_size):
+                    count = min(chunk_size, end - chunk_start)
+                    raw = np.frombuffer(buffer, dtype=np.uint8, count=count, offset=chunk_start)
+                    codes = BASE_CODES[raw[raw > 32]]  # drop newlines and other whitespace
+                    del raw  # the mmap cannot close while a view is alive
+                    if len(codes):
+                        yield codes
+
+
+class StreamingDigest:
+    """
+    Digests a FASTA file chunk by chunk without loading it: each chunk is scanned
+    together with the last max_site_len - 1 bases of the previous one, and cut
+    sites are emitted as soon as they are known. Peak memory depends on the
+    chunk size, not on the sequence length. For a circular molecule the first
+    bases are kept so sites spanning the origin are found after the last chunk.
+    """
+
+    def __init__(self, enzyme_set, circular=False, chunk_size=DIGEST_CHUNK_SIZE):
+        self.enzyme_set = enzyme_set
+        self.circular = circular
+        self.chunk_size = chunk_size
+        self.length = None
+
+    def iter_sites(self, path):
+        """Yields (enzyme index, cut position) arrays; self.length is set once exhausted."""
+        overlap = max(self.enzyme_set.max_site_len - 1, 0)
+        carry = head = np.empty(0, dtype=np.uint8)
+        pending_enzymes = np.empty(0, dtype=np.int32)
+        pending_cuts = np.empty(0, dtype=np.int64)
+        processed = 0
+        for chunk in iter_fasta_codes(path, self.chunk_size):
+            if len(head) < overlap:
+                head = np.concatenate((head, chunk[:overlap - len(head)]))
+            codes = np.concatenate((carry, chunk))
+            enzyme_idx, cuts = self.enzyme_set.scan_codes(codes, offset=processed - len(carry), new_from=len(carry))
+            processed += len(chunk)
+            carry = codes[max(len(codes) - overlap, 0):].copy()
+
+            enzyme_idx = np.concatenate((pending_enzymes, enzyme_idx))
+            cuts = np.concatenate((pending_cuts, cuts))
+            # cuts past the end read so far (or before the origin of a circle) wait for the total length
+            ready = (cuts >= (0 if self.circular else 1)) & (cuts < processed)
+            waiting = ~ready & ((cuts > 0) | self.circular)
+            pending_enzymes, pending_cuts = enzyme_idx[waiting], cuts[waiting]
+            if ready.any():
+                yield enzyme_idx[ready], cuts[ready]
+
+        self.length = processed
+        if not processed:
+            return
+        if self.circular:
+            enzyme_idx, cuts = self.enzyme_set.scan_codes(np.concatenate((carry, head)),
+                                                          offset=processed - len(carry), new_from=len(carry))
+            enzyme_idx = np.concatenate((pending_enzymes, enzyme_idx))
+            cuts = np.concatenate((pending_cuts, cuts)) % processed
+        else:
+            keep = pending_cuts < processed
+            enzyme_idx, cuts = pending_enzymes[keep], pending_cuts[keep]
+        if len(cuts):
+            yield enzyme_idx, cuts
+
+    def digest(self, path):
+        """Same result as EnzymeSet.digest, but read from a FASTA file in chunks."""
+        enzyme_parts, cut_parts = [], []
+        for enzyme_idx, cuts in self.iter_sites(path):
+            enzyme_parts.append(enzyme_idx)
+            cut_parts.append(cuts)
+        if cut_parts:
+            site_arrays = self.enzyme_set.group_sites(np.concatenate(enzyme_parts), np.concatenate(cut_parts))
+        else:
+            site_arrays = self.enzyme_set.group_sites(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64))
+        return self.enzyme_set.digest_from_sites(self.length, site_arrays, self.circular)
 
 
 def load_fasta_sequence(path):
     path = Path(path)
     with path.open("r") as f:
-        lines = f.readlines()
-    seq = "".join(line.strip() for line in lines if not line.startswith(">"))
+        seq = "".join(line.strip() for line in f if not line.startswith(">"))
     return seq.upper()
 
 
-def print_digest_report(enzyme, dna_seq):
-    sites, fragments = enzyme.digest(dna_seq)
+def print_digest_report(enzyme, dna_seq, digest=None):
+    sites, fragments = digest if digest is not None else enzyme.digest(dna_seq)
     print(f"=== {enzyme.name} ===")
     print(f"Recognition sequence: {enzyme.recognition_seq}")
     print(f"Number of cleavages: {len(sites)}")
@@ -63,17 +337,130 @@ def print_digest_report(enzyme, dna_seq):
     print()
 
 
-def compute_fragments_from_sites(dna_length, sites):
-    sites = sorted(sites)
-    if not sites:
-        return [(0, dna_length)]
-    fragments = []
-    prev = 0
-    for s in sites:
-        fragments.append((prev, s))
-        prev = s
-    fragments.append((prev, dna_length))
-    return fragments
+def compute_fragments_from_sites(dna_length, sites, circular=False):
+    """
+    (start, end) fragments between sorted cut sites. On a circular molecule the
+    last fragment runs across the origin, so its end exceeds dna_length; a circle
+    without cuts stays one piece of dna_length bp.
+    """
+    if not isinstance(sites, np.ndarray):
+        sites = np.fromiter(sites, dtype=np.int64)
+    sites = np.unique(sites.astype(np.int64))
+    if circular and len(sites):
+        bounds = np.append(sites, sites[0] + dna_length)
+    else:
+        bounds = np.concatenate(([0], sites, [dna_length]))
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+class DigestPlanner:
+    """
+    Ranks double/triple (or any k-enzyme) digests of one sequence. Every
+    enzyme's sorted site array is computed once; combinations are then merged
+    in batches as rows of a padded matrix, so one sort per batch replaces a
+    compute_fragments_from_sites call per combination.
+    """
+
+    METRICS = ("n_fragments", "out_of_window", "unresolved", "min_size", "max_size")
+
+    def __init__(self, dna_seq, enzymes, batch_size=20_000):
+        self.enzyme_set = EnzymeSet(enzymes)
+        self.dna_len = len(dna_seq)
+        self.sites = self.enzyme_set.site_arrays(dna_seq)
+        self.batch_size = batch_size
+
+    def _padded_sites(self, candidates):
+        width = max((len(self.sites[i]) for i in candidates), default=0)
+        padded = np.full((len(self.sites), max(width, 1)), self.dna_len, dtype=np.int64)
+        for i in candidates:
+            padded[i, :len(self.sites[i])] = self.sites[i]
+        return padded
+
+    def evaluate(self, combos, size_window, resolution, padded=None):
+        """
+        Metrics for an (n, k) array of enzyme indices. Fragments outside
+        size_window count as out_of_window; neighbouring bands whose sizes differ
+        by less than `resolution` (relative) count as unresolved.
+        """
+        combos = np.asarray(combos, dtype=np.intp)
+        if padded is None:
+            padded = self._padded_sites(np.unique(combos).tolist())
+        low, high = size_window
+        result = {name: np.empty(len(combos), dtype=np.int64) for name in self.METRICS}
+        for begin in range(0, len(combos), self.batch_size):
+            batch = combos[begin:begin + self.batch_size]
+            merged = np.sort(padded[batch].reshape(len(batch), -1), axis=1)
+            bounds = np.concatenate((np.zeros((len(batch), 1), dtype=np.int64), merged,
+                                     np.full((len(batch), 1), self.dna_len, dtype=np.int64)), axis=1)
+            # shared sites and padding show up as zero-length fragments
+            bands = np.sort(np.diff(bounds, axis=1), axis=1)
+            real = bands > 0
+            n_fragments = real.sum(axis=1)
+            in_window = (real & (bands >= low) & (bands <= high)).sum(axis=1)
+            close = real[:, :-1] & (bands[:, 1:] < bands[:, :-1] * (1 + resolution))
+            part = slice(begin, begin + len(batch))
+            result["n_fragments"][part] = n_fragments
+            result["out_of_window"][part] = n_fragments - in_window
+            result["unresolved"][part] = close.sum(axis=1)
+            result["min_size"][part] = np.where(real, bands, self.dna_len).min(axis=1)
+            result["max_size"][part] = bands[:, -1]
+        return result
+
+    def plan(self, sizes=(2, 3), size_window=(100, 10_000), fragment_count=(2, 20), resolution=0.05,
+             rank_by=("out_of_window", "unresolved", "-n_fragments"), top=10):
+        """
+        Best enzyme combinations as a list of dicts, ranked by `rank_by`
+        (metric names, "-" for descending). Enzymes that never cut are skipped,
+        and so is any combination containing an enzyme or pair that already
+        gives more than fragment_count[1] fragments.
+        """
+        min_count, max_count = fragment_count
+        candidates = [i for i, sites in enumerate(self.sites) if 0 < len(sites) < max_count]
+        padded = self._padded_sites(candidates)
+        pair_ok = None
+        combos_by_size, metrics_by_size = [], []
+        for k in sorted(sizes):
+            combos = np.fromiter((i for combo in combinations(candidates, k) for i in combo),
+                                 dtype=np.intp).reshape(-1, k)
+            if k > 2:
+                if pair_ok is None:
+                    pair_ok = self._pairs_within(candidates, size_window, resolution, padded, max_count)
+                keep = np.ones(len(combos), dtype=bool)
+                for a, b in combinations(range(k), 2):
+                    keep &= pair_ok[combos[:, a], combos[:, b]]
+                combos = combos[keep]
+            metrics = self.evaluate(combos, size_window, resolution, padded)
+            if k == 2:
+                pair_ok = self._pairs_within(candidates, size_window, resolution, padded, max_count, combos, metrics)
+            combos_by_size.append(combos)
+            metrics_by_size.append(metrics)
+
+        n_fragments = np.concatenate([m["n_fragments"] for m in metrics_by_size])
+        chosen = np.flatnonzero((n_fragments >= min_count) & (n_fragments <= max_count))
+        columns = {name: np.concatenate([m[name] for m in metrics_by_size])[chosen] for name in self.METRICS}
+        keys = [-columns[key[1:]] if key.startswith("-") else columns[key] for key in reversed(rank_by)]
+        order = np.lexsort(keys)[:top] if keys else np.arange(min(top, len(chosen)))
+
+        offsets = np.cumsum([0] + [len(c) for c in combos_by_size])
+        plan = []
+        for j in order:
+            size_idx = np.searchsorted(offsets, chosen[j], side="right") - 1
+            combo = combos_by_size[size_idx][chosen[j] - offsets[size_idx]]
+            entry = {"enzymes": [self.enzyme_set.names[i] for i in combo]}
+            entry.update({name: int(columns[name][j]) for name in self.METRICS})
+            plan.append(entry)
+        return plan
+
+    def _pairs_within(self, candidates, size_window, resolution, padded, max_count, pairs=None, metrics=None):
+        """Symmetric mask of enzyme pairs giving at most max_count fragments."""
+        if pairs is None:
+            pairs = np.array(list(combinations(candidates, 2)), dtype=np.intp).reshape(-1, 2)
+            metrics = self.evaluate(pairs, size_window, resolution, padded)
+        pair_ok = np.zeros((len(self.sites), len(self.sites)), dtype=bool)
+        ok = metrics["n_fragments"] <= max_count
+        pair_ok[pairs[ok, 0], pairs[ok, 1]] = True
+        pair_ok[pairs[ok, 1], pairs[ok, 0]] = True
+        return pair_ok
 
 
 def simulate_gel(enzyme_fragments, gel_width=60):
@@ -106,6 +493,82 @@ def simulate_gel(enzyme_fragments, gel_width=60):
         print()
 
 
+def gel_bands(enzyme_fragments, ladder=GEL_LADDER, height=GEL_HEIGHT, resolution=GEL_RESOLUTION):
+    """
+    Band positions for every lane at once: (lane, top row, bottom row, mass)
+    arrays. Lane 0 is the ladder, then one lane per entry of enzyme_fragments.
+    Rows follow the log-migration model of draw_gel in Project_L6: the largest
+    fragment sits just below the wells, the smallest at the bottom. Bands in a
+    lane that land closer than `resolution` pixels merge into one band spanning
+    them, with their DNA masses (bp) summed.
+    """
+    lanes = [list(ladder)] + [list(frags) for frags in enzyme_fragments.values()]
+    lengths = np.concatenate([np.asarray(frags, dtype=np.float64) for frags in lanes])
+    lane_idx = np.repeat(np.arange(len(lanes)), [len(frags) for frags in lanes])
+    keep = lengths > 0
+    lengths, lane_idx = lengths[keep], lane_idx[keep]
+    if not len(lengths):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty
+
+    log_max, log_min = np.log10(lengths.max()), np.log10(lengths.min())
+    rel_migration = (log_max - np.log10(lengths)) / (log_max - log_min + 1e-9)
+    rows = np.rint(rel_migration * (height - 1)).astype(np.int64)
+
+    order = np.lexsort((rows, lane_idx))
+    rows, lane_idx, lengths = rows[order], lane_idx[order], lengths[order]
+    new_band = np.ones(len(rows), dtype=bool)
+    new_band[1:] = (lane_idx[1:] != lane_idx[:-1]) | (rows[1:] - rows[:-1] >= resolution)
+    starts = np.flatnonzero(new_band)
+    ends = np.append(starts[1:], len(rows)) - 1
+    return lane_idx[starts], rows[starts], rows[ends], np.add.reduceat(lengths, starts).astype(np.int64)
+
+
+def render_gel(enzyme_fragments, ladder=GEL_LADDER, height=GEL_HEIGHT, resolution=GEL_RESOLUTION):
+    """Rasterizes all lanes into a grayscale uint8 image (bright bands on a dark gel)."""
+    lane, top, bottom, mass = gel_bands(enzyme_fragments, ladder, height, resolution)
+    n_lanes = len(enzyme_fragments) + 1
+    profile = np.zeros((height + 2 * GEL_MARGIN, n_lanes), dtype=np.float64)
+    # expand every band into the pixel rows it covers
+    span = bottom - top + BAND_HEIGHT
+    band_of_row = np.repeat(np.arange(len(lane)), span)
+    first_row = np.repeat(np.cumsum(span) - span, span)
+    pixel_rows = GEL_MARGIN + np.repeat(top - BAND_HEIGHT // 2, span) + np.arange(span.sum()) - first_row
+    brightness = np.log1p(mass) / np.log1p(mass.max()) if len(mass) else mass
+    np.maximum.at(profile, (pixel_rows, lane[band_of_row]), brightness[band_of_row])
+
+    pitch = LANE_WIDTH + LANE_GAP
+    column_lane = np.arange(n_lanes * pitch + LANE_GAP) - LANE_GAP
+    in_lane = (column_lane >= 0) & (column_lane % pitch < LANE_WIDTH)
+    column_lane = np.where(in_lane, column_lane // pitch, 0)
+    image = np.where(in_lane, profile[:, column_lane], 0.0)
+    gel = np.full(image.shape, 25, dtype=np.uint8)
+    gel[GEL_MARGIN - 4:GEL_MARGIN - 1, :] = np.where(in_lane, 90, 25)  # wells
+    return np.maximum(gel, (image * 255).astype(np.uint8))
+
+
+def write_png(path, image):
+    """Writes a 2D uint8 array as an 8-bit grayscale PNG (no GUI or imaging library needed)."""
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width = image.shape
+    raw = np.zeros((height, width + 1), dtype=np.uint8)  # filter byte 0 in front of every row
+    raw[:, 1:] = image
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+def render_gel_png(enzyme_fragments, path=GEL_PNG_PATH, **options):
+    write_png(path, render_gel(enzyme_fragments, **options))
+    return path
+
+
 def main():
     dna_seq = (
         "ATGCGGAATTCCGGAATTCTTGGATCCGCTTAAGATCGGAAGCTTTTTCGAGGCCGGCC"
@@ -125,19 +588,15 @@ def main():
     ]
 
     all_fragments_for_gel = {}
+    digests = EnzymeSet(enzymes).digest(dna_seq)
 
     for enzyme in enzymes:
-        print_digest_report(enzyme, dna_seq)
-        _, fragments = enzyme.digest(dna_seq)
+        print_digest_report(enzyme, dna_seq, digests[enzyme.name])
+        _, fragments = digests[enzyme.name]
         lengths = [end - start for (start, end) in fragments]
         all_fragments_for_gel[enzyme.name] = lengths
 
-    all_sites = set()
-    for enzyme in enzymes:
-        sites = enzyme.find_cleavage_sites(dna_seq)
-        all_sites.update(sites)
-    all_sites = sorted(all_sites)
-    combined_fragments = compute_fragments_from_sites(len(dna_seq), all_sites)
+    all_sites, combined_fragments = digests[None]
     combined_lengths = [end - start for (start, end) in combined_fragments]
     all_fragments_for_gel["All enzymes"] = combined_lengths
 
@@ -151,7 +610,17 @@ def main():
         print(f"  Fragment {i}: start={start + 1}, end={end}, length={length} bp")
     print()
 
+    print("=== Best double/triple digests (fragments of 20-100 bp) ===")
+    planner = DigestPlanner(dna_seq, enzymes)
+    for entry in planner.plan(size_window=(20, 100), fragment_count=(2, 12), top=5):
+        print(f"  {' + '.join(entry['enzymes'])}: {entry['n_fragments']} fragments, "
+              f"{entry['min_size']}-{entry['max_size']} bp, {entry['out_of_window']} outside window, "
+              f"{entry['unresolved']} unresolved bands")
+    print()
+
     simulate_gel(all_fragments_for_gel)
+    path = render_gel_png(all_fragments_for_gel, ladder=(100, 75, 50, 25, 10))
+    print(f"Gel image (ladder + {len(all_fragments_for_gel)} lanes) written to {path}")
 
 
 if __name__ == "__main__":
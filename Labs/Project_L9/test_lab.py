@@ -0,0 +1,33 @@
+import random
+
+import pytest
+
+from lab import EnzymeSet, RestrictionEnzyme, StreamingDigest, load_fasta_sequence
+
+ECORI = RestrictionEnzyme("EcoRI", "GAATTC", 1)
+
+
+def write_fasta(path, records):
+    path.write_text("".join(f">{name}\n{seq}\n" for name, seq in records))
+    return path
+
+
+@pytest.mark.parametrize("circular", [False, True])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 4_000_000])
+def test_streaming_digest_finds_sites_across_record_and_chunk_boundaries(tmp_path, chunk_size, circular):
+    path = write_fasta(tmp_path / "split.fa", [("a", "GGAA"), ("b", "TTCAAAAAAAAAA")])
+    enzymes = EnzymeSet([ECORI])
+    expected = enzymes.digest(load_fasta_sequence(path), circular)
+    assert expected["EcoRI"][0] == [2]
+    assert StreamingDigest(enzymes, circular, chunk_size).digest(path) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 7, 64])
+def test_streaming_digest_matches_in_memory_digest(tmp_path, chunk_size):
+    rng = random.Random(chunk_size)
+    records = [(f"r{i}", "".join(rng.choice("ACGT") for _ in range(rng.randint(1, 40)))) for i in range(30)]
+    path = write_fasta(tmp_path / "random.fa", records)
+    enzymes = EnzymeSet([ECORI, RestrictionEnzyme("TaqI", "TCGA", 1), RestrictionEnzyme("HinfI", "GANTC", 1)])
+    for circular in (False, True):
+        expected = enzymes.digest(load_fasta_sequence(path), circular)
+        assert StreamingDigest(enzymes, circular, chunk_size).digest(path) == expected
@@ -0,0 +1,202 @@
+#Random access to the records of a FASTA file through a samtools-style .fai sidecar
+#(name, length, byte offset, bases per line, bytes per line), built once on first use.
+#Shared by the GUI labs, which put Labs/common on sys.path before importing it.
+
+import os
+
+FAI_SUFFIX = ".fai"
+
+
+class FaiEntry:
+    def __init__(self, name, length, offset, line_bases, line_bytes):
+        self.name = name
+        self.length = length
+        self.offset = offset  # byte position of the first base
+        self.line_bases = line_bases
+        self.line_bytes = line_bytes  # line_bases plus the line terminator
+
+    def to_line(self):
+        return f"{self.name}\t{self.length}\t{self.offset}\t{self.line_bases}\t{self.line_bytes}\n"
+
+    @classmethod
+    def from_line(cls, line):
+        name, *numbers = line.rstrip("\n").split("\t")[:5]
+        return cls(name, *map(int, numbers))
+
+
+def build_index(path):
+    """
+    One pass over the file. Every sequence line of a record except the last must
+    have the same width, otherwise positions cannot be computed and ValueError is raised.
+    Sequence before the first header is kept as one record with an empty name.
+    """
+    entries = []
+    entry = None
+    short_line = False  # a shorter line was seen, so it has to be the record's last
+    offset = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            line_start, offset = offset, offset + len(raw)
+            if raw.startswith(b">"):
+                name = raw[1:].split(None, 1)[0].decode("utf-8", "replace") if raw[1:].strip() else ""
+                entry = FaiEntry(name, 0, offset, 0, 0)
+                entries.append(entry)
+                short_line = False
+                continue
+            bases = len(raw.rstrip(b"\r\n"))
+            if entry is None:
+                if not bases:
+                    continue
+                entry = FaiEntry("", 0, line_start, 0, 0)
+                entries.append(entry)
+            if not bases:
+                if entry.line_bases == 0:
+                    entry.offset = offset  # blank lines before the first sequence line
+                else:
+                    short_line = True
+                continue
+            if entry.line_bases == 0:
+                entry.line_bases, entry.line_bytes = bases, len(raw)
+            elif short_line or bases > entry.line_bases or (bases == entry.line_bases and len(raw) != entry.line_bytes):
+                raise ValueError(f"{path}: record '{entry.name}' has uneven line lengths near byte {line_start}.")
+            if bases < entry.line_bases:
+                short_line = True
+            entry.length += bases
+    return entries
+
+
+def write_index(entries, fai_path):
+    with open(fai_path, "w", encoding="utf-8") as f:
+        f.writelines(entry.to_line() for entry in entries)
+
+
+def read_index(fai_path):
+    with open(fai_path, "r", encoding="utf-8") as f:
+        return [FaiEntry.from_line(line) for line in f if line.strip()]
+
+
+class FastaIndex:
+    """
+    index = FastaIndex("genome.fa"); index.names; index[name][a:b]
+    Reuses path + ".fai" when it is newer than the FASTA file, otherwise builds it and
+    tries to save it next to the file. Every fetch opens the file, seeks once and reads
+    only the bytes of the requested range.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        fai_path = path + FAI_SUFFIX
+        if os.path.exists(fai_path) and os.path.getmtime(fai_path) >= os.path.getmtime(path):
+            entries = read_index(fai_path)
+        else:
+            entries = build_index(path)
+            try:
+                write_index(entries, fai_path)
+            except OSError:
+                pass  # read-only location: the index just lives in memory this time
+        self.entries = {}
+        for entry in entries:
+            if entry.name in self.entries:
+                raise ValueError(f"{path}: duplicate record name '{entry.name}'.")
+            self.entries[entry.name] = entry
+        self.names = [entry.name for entry in entries]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __getitem__(self, name):
+        return FastaRecord(self, self.entries[name])
+
+    def fetch(self, name, start=0, end=None):
+        """Bases start..end-1 (0-based, end exclusive) of a record, as stored (case kept)."""
+        entry = self.entries[name]
+        end = entry.length if end is None else min(end, entry.length)
+        start = max(start, 0)
+        if start >= end:
+            return ""
+        first = self._byte_offset(entry, start)
+        last = self._byte_offset(entry, end - 1)
+        with open(self.path, "rb") as f:
+            f.seek(first)
+            data = f.read(last - first + 1)
+        return data.replace(b"\n", b"").replace(b"\r", b"").decode("ascii", "replace")
+
+    @staticmethod
+    def _byte_offset(entry, i):
+        return entry.offset + (i // entry.line_bases) * entry.line_bytes + i % entry.line_bases
+
+
+class SequentialFasta(FastaIndex):
+    """
+    Stand-in for FastaIndex on files that cannot be indexed (uneven line widths,
+    repeated names): only the first record is read, front to back, and kept in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        record = read_first_record(path)
+        self.sequences = dict([record]) if record is not None else {}
+        self.entries = {name: FaiEntry(name, len(seq), 0, 0, 0) for name, seq in self.sequences.items()}
+        self.names = list(self.sequences)
+
+    def fetch(self, name, start=0, end=None):
+        return self.sequences[name][max(start, 0):end]
+
+
+def read_first_record(path):
+    """(name, sequence) of the first record, or None for a file without sequence; a headerless file is one unnamed record."""
+    name, parts = None, []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(">"):
+                if name is not None:
+                    break
+                name = line[1:].split(None, 1)[0] if line[1:].strip() else ""
+            elif line:
+                if name is None:
+                    name = ""
+                parts.append(line)
+    return None if name is None else (name, "".join(parts))
+
+
+def load_fasta(path):
+    """FastaIndex(path), or a SequentialFasta holding the first record when the file cannot be indexed."""
+    try:
+        return FastaIndex(path)
+    except ValueError:
+        return SequentialFasta(path)
+
+
+class FastaRecord:
+    """One record of a FastaIndex: len() and slicing read from disk on demand."""
+
+    def __init__(self, index, entry):
+        self.index = index
+        self.name = entry.name
+        self.length = entry.length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            # read the covered range once; str slicing then applies the step (both directions)
+            low, high = (start, stop) if step > 0 else (stop + 1, start + 1)
+            seq = self.index.fetch(self.name, low, high)
+            return seq if step == 1 else seq[::step]
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("FASTA record index out of range.")
+        return self.index.fetch(self.name, key, key + 1)
+
+    def sequence(self):
+        return self.index.fetch(self.name)
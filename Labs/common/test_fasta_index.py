@@ -0,0 +1,75 @@
+import pytest
+
+from fasta_index import FastaIndex, SequentialFasta, build_index, load_fasta
+
+
+def write_fasta(path, text, newline="\n"):
+    path.write_bytes(text.replace("\n", newline).encode("ascii"))
+    return str(path)
+
+
+def test_blank_lines_after_header_are_skipped(tmp_path):
+    path = write_fasta(tmp_path / "blank.fa", ">a\n\nACGTACGT\n>b\n\n\nACGT\nAC\n")
+    index = FastaIndex(path)
+    assert index.fetch("a") == "ACGTACGT"
+    assert index.fetch("b") == "ACGTAC"
+    assert index["b"][3:5] == "TA"
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_fetch_matches_sequence(tmp_path, newline):
+    records = {"chr1": "ACGTTGCAAC" * 7 + "GGA", "chr2": "TTTTCCCCAAAAGG", "empty": ""}
+    text = "".join(f">{name} description\n" + "".join(seq[i:i + 10] + "\n" for i in range(0, len(seq), 10))
+                   for name, seq in records.items())
+    index = FastaIndex(write_fasta(tmp_path / "multi.fa", text, newline))
+    assert index.names == list(records)
+    for name, seq in records.items():
+        assert len(index[name]) == len(seq)
+        assert index[name].sequence() == seq
+        for start, end in [(0, 1), (5, 17), (9, 11), (len(seq) - 3, len(seq) + 5)]:
+            assert index.fetch(name, start, end) == seq[start:end]
+
+
+@pytest.mark.parametrize("key", [slice(None, None, 2), slice(3, 40, 7), slice(None, None, -1),
+                                 slice(50, 4, -3), slice(-5, None, -2), slice(10, 2, 1)])
+def test_record_step_slicing(tmp_path, key):
+    seq = "ACGTTGCAACGGATCCTAGG" * 3
+    text = ">r\n" + "".join(seq[i:i + 8] + "\n" for i in range(0, len(seq), 8))
+    record = FastaIndex(write_fasta(tmp_path / "step.fa", text))["r"]
+    assert record[key] == seq[key]
+    assert record[-1] == seq[-1]
+
+
+def test_headerless_sequence_is_one_unnamed_record(tmp_path):
+    index = FastaIndex(write_fasta(tmp_path / "bare.fa", "\nACGTAC\nGGTTAA\nCC\n>b\nTTT\n"))
+    assert index.names == ["", "b"]
+    assert index.fetch("") == "ACGTACGGTTAACC"
+    assert index[""][4:9] == "ACGGT"
+    assert index.fetch("b") == "TTT"
+
+
+def test_uneven_lines_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="uneven"):
+        build_index(write_fasta(tmp_path / "uneven.fa", ">a\nACGT\nAC\nACGT\n"))
+
+
+@pytest.mark.parametrize("text, name", [(">a desc\nACGT\nAC\nACGT\n>b\nGG\n", "a"),
+                                        ("ACGT\nAC\n\nACGT\n>b\nGG\n", "")])
+def test_load_fasta_reads_first_record_when_lines_are_uneven(tmp_path, text, name):
+    fasta = load_fasta(write_fasta(tmp_path / "uneven.fa", text))
+    assert isinstance(fasta, SequentialFasta)
+    assert fasta.names == [name] and len(fasta) == 1
+    record = fasta[name]
+    assert len(record) == 10 and record.sequence() == "ACGTACACGT"
+    assert record[2:7] == "GTACA" and record[::-3] == "ACGTACACGT"[::-3]
+
+
+def test_load_fasta_indexes_even_files(tmp_path):
+    fasta = load_fasta(write_fasta(tmp_path / "even.fa", "ACGT\nAC\n"))
+    assert not isinstance(fasta, SequentialFasta)
+    assert fasta.fetch("") == "ACGTAC"
+
+
+def test_duplicate_record_names_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="duplicate"):
+        FastaIndex(write_fasta(tmp_path / "dup.fa", ">a first\nACGT\n>a second\nTTTT\n"))
@@ -0,0 +1,109 @@
+#Background jobs for the Tk apps: the work runs off the main thread, and progress,
+#partial results and the final result come back to Tk through after().
+#Shared by the GUI labs, which put Labs/common on sys.path before importing it.
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+POLL_MS = 50  # how often the Tk side drains messages from a running job
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Job:
+    """Handle passed to a job function as its first argument, and returned to the caller of submit."""
+
+    def __init__(self):
+        self._cancel = threading.Event()
+        self._messages = queue.Queue()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        """Call between steps of a long job: stops it with Cancelled once cancel() was requested."""
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def progress(self, text):
+        self._messages.put(("progress", text))
+
+    def partial(self, value):
+        self._messages.put(("partial", value))
+
+
+class TkWorker:
+    """
+    Runs jobs for a Tk app on a worker thread, one at a time: submitting a new job
+    cancels the previous one. fn(job, *args) reports through the Job it receives,
+    and every callback (on_done, on_partial, on_error) runs on the Tk main thread.
+    """
+
+    def __init__(self, root, status_var=None):
+        self.root = root
+        self.status_var = status_var
+        self.threads = ThreadPoolExecutor(1)
+        self.job = None
+
+    def submit(self, fn, *args, on_done=None, on_partial=None, on_error=None, **kwargs):
+        self.cancel()
+        job = Job()
+        future = self.threads.submit(fn, job, *args, **kwargs)
+        self.job = job
+        self.root.after(POLL_MS, self._poll, job, future, on_done, on_partial, on_error)
+        return job
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+
+    def set_status(self, text):
+        if self.status_var is not None:
+            self.status_var.set(text)
+
+    def _poll(self, job, future, on_done, on_partial, on_error):
+        while True:
+            try:
+                kind, value = job._messages.get_nowait()
+            except queue.Empty:
+                break
+            if job.cancelled:
+                continue
+            if kind == "progress":
+                self.set_status(value)
+            elif on_partial is not None:
+                on_partial(value)
+
+        if not future.done():
+            self.root.after(POLL_MS, self._poll, job, future, on_done, on_partial, on_error)
+            return
+        if self.job is job:
+            self.job = None
+        if job.cancelled:
+            if self.job is None:  # leave the status alone if a newer job has taken over
+                self.set_status("Cancelled.")
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            self.set_status(f"Error: {e}")
+            if on_error is not None:
+                on_error(e)
+            else:
+                messagebox.showerror("Error", str(e))
+        else:
+            if on_done is not None:
+                on_done(result)
+
+    def shutdown(self):
+        self.cancel()
+        self.threads.shutdown(wait=False, cancel_futures=True)